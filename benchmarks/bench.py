@@ -0,0 +1,313 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from os.path import abspath, dirname, join
+from unittest.mock import patch
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from bridgeconfig import bridgeconfig  # noqa: E402
+from bridgeconfig.backends import LocalSSM  # noqa: E402
+from bridgeconfig.throttle import TokenBucket  # noqa: E402
+
+PROJECT = "bench"
+ENVIRONMENT = "dev"
+
+# how the parameters are spread over the search path prefixes
+LAYOUTS = {
+    "project": ["/{}/{}/".format(PROJECT, ENVIRONMENT)],
+    "spread": [
+        "/All/All/",
+        "/All/{}/".format(ENVIRONMENT),
+        "/{}/All/".format(PROJECT),
+        "/{}/{}/".format(PROJECT, ENVIRONMENT),
+    ],
+}
+
+SETTINGS_TOML = """[default]
+APP_NAME = "{project}"
+PLAIN = "plain"
+{aws}
+"""
+
+
+def make_ssm(args, count, layout="project", secure_ratio=0.0):
+    prefixes = LAYOUTS[layout]
+    parameters = {}
+    for i in range(count):
+        name = "{}key{:05}".format(prefixes[i % len(prefixes)], i)
+        secure = secure_ratio and i % int(1 / secure_ratio) == 0
+        parameters[name] = ("value{}".format(i), "SecureString" if secure else "String")
+    return LocalSSM(
+        parameters, latency=args.latency, throttle_rate=args.throttle_rate, seed=0
+    )
+
+
+def make_bridge_config(args, ssm, **kwargs):
+    # no rate limiting unless it is measured, then a fresh token bucket per
+    # instance, the process wide one would carry its tokens (and throttled
+    # rate) from one benchmark to the next. Throttled calls are only retried
+    # through a token bucket
+    limiter = None
+    if args.rate_limit or args.throttle_rate:
+        limiter = TokenBucket(rate=args.rate_limit or 40, capacity=100)
+    return bridgeconfig.BridgeConfig(
+        PROJECT, ENVIRONMENT, client=ssm, rate_limiter=limiter, **kwargs
+    )
+
+
+def timeit(func, repeat, setup=None):
+    # best of repeat, func returns the number of operations it performed
+    best = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        ops = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[0]:
+            best = (elapsed, ops)
+    return best
+
+
+def result(elapsed, ops=1, ssm=None, **extra):
+    data = {"seconds": elapsed, "ops": ops, "ops_per_sec": ops / elapsed}
+    if ssm is not None:
+        data["calls"] = dict(ssm.calls)
+    data.update(extra)
+    return data
+
+
+def bench_refresh_cache(args, results):
+    for count in args.sizes:
+        for layout in LAYOUTS:
+            for max_workers in (1, 4):
+                ssm = make_ssm(args, count, layout)
+
+                def run():
+                    ssm.calls.clear()
+                    bc = make_bridge_config(args, ssm, max_workers=max_workers)
+                    bc.refresh_cache()
+                    return 1
+
+                elapsed, ops = timeit(run, args.repeat)
+                name = "refresh_cache/{}/{}/workers={}".format(
+                    count, layout, max_workers
+                )
+                results[name] = result(elapsed, ops, ssm)
+
+
+def bench_get_parameter(args, results):
+    count = max(args.sizes)
+    ssm = make_ssm(args, count, "spread")
+    bc = make_bridge_config(args, ssm)
+    bc.refresh_cache()
+    keys = ["key{:05}".format(i) for i in range(count)]
+    lookups = args.lookups
+
+    def hits():
+        for i in range(lookups):
+            bc.get_parameter(keys[i % count], decrypt=False)
+        return lookups
+
+    ssm.calls.clear()
+    elapsed, ops = timeit(hits, args.repeat)
+    results["get_parameter/hit"] = result(elapsed, ops, ssm)
+
+    def misses():
+        for i in range(100):
+            bc.get_parameter("missing{}".format(i % 10), default=None)
+        return 100
+
+    ssm.calls.clear()
+    elapsed, ops = timeit(misses, args.repeat)
+    results["get_parameter/miss"] = result(elapsed, ops, ssm)
+
+
+def bench_decrypt_parameters(args, results):
+    for count in args.sizes:
+        ssm = make_ssm(args, count, "project", secure_ratio=1.0)
+        bc = make_bridge_config(args, ssm)
+
+        def setup():
+            bc.refresh_cache()
+            ssm.calls.clear()
+
+        def run():
+            bc.decrypt_parameters()
+            return count
+
+        elapsed, ops = timeit(run, args.repeat, setup)
+        results["decrypt_parameters/{}".format(count)] = result(elapsed, ops, ssm)
+
+
+def bench_settings(args, results):
+    count = 20
+    ssm = make_ssm(args, count, "project", secure_ratio=0.5)
+    directory = tempfile.mkdtemp()
+    with open(join(directory, "settings.toml"), "w") as fp:
+        fp.write(
+            SETTINGS_TOML.format(
+                project=PROJECT,
+                aws="\n".join(
+                    'KEY{0:05} = "@aws key{0:05} decrypt"'.format(i)
+                    for i in range(count)
+                ),
+            )
+        )
+
+    os.environ["SETTINGS_PATH"] = directory
+    os.environ["ENVIRONMENT"] = ENVIRONMENT
+    from bridgeconfig import conf
+
+    bc = make_bridge_config(args, ssm)
+    with patch.object(conf.aws_formatter, "bridge_config", bc):
+        keys = ["KEY{:05}".format(i) for i in range(count)] + ["PLAIN"]
+
+        def run():
+            for _ in range(args.lookups // len(keys)):
+                for key in keys:
+                    getattr(conf.settings, key)
+            return args.lookups // len(keys) * len(keys)
+
+        ssm.calls.clear()
+        elapsed, ops = timeit(run, args.repeat)
+    results["settings/getattr"] = result(elapsed, ops, ssm)
+
+
+def bench_cli(args, results):
+    from click.testing import CliRunner
+
+    from bridgeconfig.cli import cli
+
+    ssm = make_ssm(args, max(args.sizes), "spread", secure_ratio=0.1)
+    for command in (["show"], ["show", "-x"], ["show", "key00001", "key00002"]):
+        with patch.object(bridgeconfig.registry, "get_client", return_value=ssm):
+
+            def run():
+                bridgeconfig.registry.clear()
+                with redirect_stdout(StringIO()):
+                    response = CliRunner().invoke(
+                        cli, ["-p", PROJECT, "-e", ENVIRONMENT] + command
+                    )
+                if response.exit_code:
+                    raise RuntimeError(response.output)
+                return 1
+
+            ssm.calls.clear()
+            elapsed, ops = timeit(run, args.repeat)
+        results["cli/{}".format(" ".join(command))] = result(elapsed, ops, ssm)
+
+
+BENCHMARKS = {
+    "refresh_cache": bench_refresh_cache,
+    "get_parameter": bench_get_parameter,
+    "decrypt_parameters": bench_decrypt_parameters,
+    "settings": bench_settings,
+    "cli": bench_cli,
+}
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, data in sorted(results.items()):
+        base = baseline.get(name)
+        if base is None:
+            continue
+        ratio = data["seconds"] / base["seconds"] if base["seconds"] else 1
+        status = "REGRESSION" if ratio > 1 + tolerance else "ok"
+        print(  # noqa
+            "{:60} {:>10.4f}s {:>10.4f}s {:>7.2f}x {}".format(
+                name, base["seconds"], data["seconds"], ratio, status
+            ),
+            file=sys.stderr,
+        )
+        if status != "ok":
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="bridgeconfig benchmarks against a simulated ssm"
+    )
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        help="benchmarks to run ({}), all by default".format(", ".join(BENCHMARKS)),
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.005, help="seconds per ssm call"
+    )
+    parser.add_argument(
+        "--throttle-rate",
+        type=float,
+        default=0,
+        help="probability of a ThrottlingException per ssm call",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=0,
+        help="requests per second of the token bucket (default: not limited, 40 "
+        "with --throttle-rate)",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(v) for v in value.split(",")],
+        default=[100, 1000],
+        help="comma separated number of parameters",
+    )
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", help="write the json results to a file")
+    parser.add_argument("--baseline", help="json results to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed slowdown against the baseline (0.2 = 20%%)",
+    )
+    args = parser.parse_args(argv)
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error("unknown benchmark {}".format(name))
+
+    results = {}
+    for name in args.benchmarks or BENCHMARKS:
+        BENCHMARKS[name](args, results)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "latency": args.latency,
+            "throttle_rate": args.throttle_rate,
+            "rate_limit": args.rate_limit,
+            "sizes": args.sizes,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as fp:
+            fp.write(output)
+    else:
+        print(output)  # noqa
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)["results"]
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,16 @@
 from .bridgeconfig import BridgeConfig
-from .cli import cli
 
 VERSION = "1.7"
 
-__all__ = ["BridgeConfig", "cli", "VERSION"]
+__all__ = ["AsyncBridgeConfig", "BridgeConfig", "VERSION"]
+
+
+# the async wrapper (asyncio) is only imported when used, as the cli (click,
+# termcolor, terminaltables) which is the bridgeconfig.cli module (the click
+# group is bridgeconfig.cli.cli)
+def __getattr__(name):
+    if name == "AsyncBridgeConfig":
+        from .aio import AsyncBridgeConfig
+
+        return AsyncBridgeConfig
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -0,0 +1,158 @@
+import asyncio
+import functools
+
+from .bridgeconfig import EMPTY, BridgeConfig, ParameterNotFound, list_chunks, log
+
+
+# same resolution rules as BridgeConfig (the bookkeeping is delegated to a
+# wrapped instance) but every ssm call runs on the loop's executor, prefixes
+# and decryption chunks are sent concurrently up to max_workers at a time
+class AsyncBridgeConfig(object):
+    def __init__(self, project, environment, max_workers=4, **kwargs):
+        self.bridge_config = BridgeConfig(
+            project, environment, max_workers=max_workers, **kwargs
+        )
+        self.max_workers = max_workers
+        self._semaphore = None
+        self._refresh_lock = None
+
+    @property
+    def project(self):
+        return self.bridge_config.project
+
+    @property
+    def environment(self):
+        return self.bridge_config.environment
+
+    @property
+    def client(self):
+        return self.bridge_config.client
+
+    @property
+    def search_path(self):
+        return self.bridge_config.search_path
+
+    def parameter_sarch_path(self, path):
+        return self.bridge_config.parameter_sarch_path(path)
+
+    async def run(self, func, *args, **kwargs):
+        # asyncio primitives are created lazily so they belong to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(self.max_workers or 1, 1))
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(func, *args, **kwargs)
+            )
+
+    async def get_raw_parameters(self, decrypt=False, reuse=False):
+        result = []
+        for parameters in await asyncio.gather(
+            *(
+                self.run(self.bridge_config.get_prefix_parameters, path, decrypt, reuse)
+                for path in self.search_path
+            )
+        ):
+            result.extend(parameters)
+        return result
+
+    async def refresh_cache(self, reuse=False):
+        log.debug("refreshing cache")
+        parameters = await self.get_raw_parameters(reuse=reuse)
+        self.bridge_config.update_cache(
+            parameters, self.bridge_config.prefixes_fetched_at()
+        )
+        self.bridge_config.save_snapshot()
+
+    async def load_cache(self):
+        if self.bridge_config._state is not None:
+            return
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            if self.bridge_config._state is not None:
+                return
+            snapshot = self.bridge_config.snapshot
+            if snapshot is not None:
+                loaded = snapshot.load(self.project, self.environment)
+                if loaded is not None:
+                    fetched_at, parameters = loaded
+                    self.bridge_config.update_cache(parameters, fetched_at)
+                    return
+            await self.refresh_cache(reuse=True)
+
+    async def decrypt_parameters(self, parameters=None):
+        await self.load_cache()
+        pending_to_decrypt = self.bridge_config.get_pending_to_decrypt(parameters)
+        if not pending_to_decrypt:
+            return []
+
+        values, invalid = self.bridge_config.read_decrypted(
+            await asyncio.gather(
+                *(
+                    self.run(
+                        self.client.get_parameters, Names=chunk, WithDecryption=True
+                    )
+                    for chunk in list_chunks(pending_to_decrypt, 10)
+                )
+            )
+        )
+        self.bridge_config.set_decrypted(values)
+        return invalid
+
+    async def get_all_parameters(self, decrypt=False, count=10, sorted=True):
+        await self.load_cache()
+        if decrypt:
+            await self.decrypt_parameters()
+        return self.bridge_config.get_all_parameters(sorted=sorted)
+
+    async def is_encrypted(self, path, default=None):
+        await self.load_cache()
+        return self.bridge_config.is_encrypted(path, default)
+
+    async def get_parameter(
+        self,
+        path,
+        type=None,
+        decrypt=True,
+        default=EMPTY,
+        include_path=False,
+        shared=False,
+    ):
+        await self.load_cache()
+        search_path, param = self.bridge_config.find_record(path)
+
+        if param is not None:
+            if decrypt and param.type == "SecureString" and not param.decrypted:
+                await self.decrypt_parameters([param.name])
+                param = self.bridge_config._state.lookup.get(param.name, param)
+        else:
+            param = await self.run(
+                self.bridge_config.fetch_parameter, search_path, decrypt
+            )
+            if param is None:
+                if default is EMPTY:
+                    raise ParameterNotFound(path, search_path)
+                return (None, default) if include_path else default
+
+        value = self.bridge_config.convert_record(param, type, shared)
+        return (param.name, value) if include_path else value
+
+    async def get_parameters(
+        self,
+        keys,
+        types=None,
+        decrypt=True,
+        default=EMPTY,
+        include_path=False,
+        shared=False,
+    ):
+        await self.load_cache()
+        return await self.run(
+            self.bridge_config.get_parameters,
+            keys,
+            types=types,
+            decrypt=decrypt,
+            default=default,
+            include_path=include_path,
+            shared=shared,
+        )
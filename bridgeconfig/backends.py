@@ -0,0 +1,268 @@
+import abc
+import base64
+import datetime
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from botocore.exceptions import ClientError
+
+
+def client_error(code, message, operation):
+    return ClientError({"Error": {"Code": code, "Message": message}}, operation)
+
+
+class ParameterNotFound(ClientError):
+    pass
+
+
+class ParameterAlreadyExists(ClientError):
+    pass
+
+
+class Exceptions(object):
+    ClientError = ClientError
+    ParameterNotFound = ParameterNotFound
+    ParameterAlreadyExists = ParameterAlreadyExists
+
+
+# the ssm calls used by BridgeConfig, any object with these methods (like the
+# boto3 ssm client) can be passed as BridgeConfig(client=...), subclasses must
+# implement all of them
+class Backend(abc.ABC):
+    exceptions = Exceptions
+
+    @abc.abstractmethod
+    def get_parameters_by_path(self, Path, **kwargs):
+        pass
+
+    @abc.abstractmethod
+    def get_parameters(self, Names, WithDecryption=False):
+        pass
+
+    @abc.abstractmethod
+    def get_parameter(self, Name, WithDecryption=False):
+        pass
+
+    @abc.abstractmethod
+    def get_parameter_history(self, Name, **kwargs):
+        pass
+
+    @abc.abstractmethod
+    def put_parameter(self, Name, Value, Type="String", Overwrite=False, **kwargs):
+        pass
+
+    @abc.abstractmethod
+    def delete_parameter(self, Name):
+        pass
+
+
+# in memory stand-in of ssm (optionally persisted to a json file) following the
+# service semantics BridgeConfig relies on: pages of MaxResults (10 by default)
+# with NextToken, up to 10 names per GetParameters, SecureString values only
+# readable WithDecryption, versions/history and ParameterNotFound errors.
+# latency (seconds per call) and throttle_rate (probability of a
+# ThrottlingException) can be injected to load test the caching paths.
+class LocalSSM(Backend):
+    def __init__(
+        self,
+        parameters=None,
+        path=None,
+        latency=0,
+        throttle_rate=0,
+        seed=None,
+        user="bridgeconfig",
+    ):
+        self.path = path
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.user = user
+        self.calls = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._history = {}
+
+        if path is not None and os.path.exists(path):
+            with open(path) as fp:
+                self._history = json.load(fp)
+
+        # initial parameters are either a value or a (value, type) tuple
+        for name, value in (parameters or {}).items():
+            type = "String"
+            if isinstance(value, tuple):
+                value, type = value
+            self.store(name, value, type)
+        if parameters:
+            self.save()
+
+    def store(self, name, value, type):
+        history = self._history.setdefault(name, [])
+        version = history[-1]["Version"] + 1 if history else 1
+        history.append(
+            {
+                "Value": value,
+                "Type": type,
+                "Version": version,
+                "LastModifiedDate": time.time(),
+                "LastModifiedUser": self.user,
+            }
+        )
+        return version
+
+    def call(self, operation):
+        with self._lock:
+            self.calls[operation] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.throttle_rate and self._random.random() < self.throttle_rate:
+            raise client_error("ThrottlingException", "Rate exceeded", operation)
+
+    def encrypt(self, value):
+        return "AQICAH" + base64.b64encode(value.encode()).decode()
+
+    def response(self, item, name, decrypt):
+        value = item["Value"]
+        if item["Type"] == "SecureString" and not decrypt:
+            value = self.encrypt(value)
+        return {
+            "Name": name,
+            "Type": item["Type"],
+            "Value": value,
+            "Version": item["Version"],
+            "LastModifiedDate": datetime.datetime.fromtimestamp(
+                item["LastModifiedDate"], datetime.timezone.utc
+            ),
+            "ARN": "arn:aws:ssm:us-east-1:000000000000:parameter" + name,
+            "DataType": "text",
+        }
+
+    def not_found(self, name, operation):
+        return ParameterNotFound(
+            {"Error": {"Code": "ParameterNotFound", "Message": name}}, operation
+        )
+
+    def save(self):
+        if self.path is None:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as fp:
+            json.dump(self._history, fp)
+        os.replace(tmp_path, self.path)
+
+    def get_parameters_by_path(
+        self,
+        Path,
+        Recursive=False,
+        WithDecryption=False,
+        MaxResults=10,
+        NextToken=None,
+        **kwargs,
+    ):
+        self.call("GetParametersByPath")
+        if MaxResults > 10:
+            raise client_error(
+                "ValidationException",
+                "MaxResults must be less than or equal to 10",
+                "GetParametersByPath",
+            )
+
+        prefix = Path.rstrip("/") + "/"
+        with self._lock:
+            names = sorted(
+                name
+                for name in self._history
+                if name.startswith(prefix)
+                and (Recursive or "/" not in name[len(prefix) :])
+            )
+            start = int(NextToken or 0)
+            page = [
+                self.response(self._history[name][-1], name, WithDecryption)
+                for name in names[start : start + MaxResults]
+            ]
+
+        response = {"Parameters": page}
+        if start + MaxResults < len(names):
+            response["NextToken"] = str(start + MaxResults)
+        return response
+
+    def get_parameters(self, Names, WithDecryption=False):
+        self.call("GetParameters")
+        if len(Names) > 10:
+            raise client_error(
+                "ValidationException",
+                "Member must have length less than or equal to 10",
+                "GetParameters",
+            )
+
+        with self._lock:
+            return {
+                "Parameters": [
+                    self.response(self._history[name][-1], name, WithDecryption)
+                    for name in Names
+                    if name in self._history
+                ],
+                "InvalidParameters": [
+                    name for name in Names if name not in self._history
+                ],
+            }
+
+    def get_parameter(self, Name, WithDecryption=False):
+        self.call("GetParameter")
+        with self._lock:
+            if Name not in self._history:
+                raise self.not_found(Name, "GetParameter")
+            return {
+                "Parameter": self.response(
+                    self._history[Name][-1], Name, WithDecryption
+                )
+            }
+
+    def get_parameter_history(
+        self, Name, WithDecryption=False, MaxResults=50, NextToken=None
+    ):
+        self.call("GetParameterHistory")
+        with self._lock:
+            if Name not in self._history:
+                raise self.not_found(Name, "GetParameterHistory")
+            start = int(NextToken or 0)
+            items = self._history[Name][start : start + MaxResults]
+            parameters = [
+                dict(
+                    self.response(item, Name, WithDecryption),
+                    LastModifiedUser=item["LastModifiedUser"],
+                )
+                for item in items
+            ]
+            total = len(self._history[Name])
+
+        response = {"Parameters": parameters}
+        if start + MaxResults < total:
+            response["NextToken"] = str(start + MaxResults)
+        return response
+
+    def put_parameter(self, Name, Value, Type="String", Overwrite=False, **kwargs):
+        self.call("PutParameter")
+        with self._lock:
+            history = self._history.setdefault(Name, [])
+            if history and not Overwrite:
+                raise ParameterAlreadyExists(
+                    {"Error": {"Code": "ParameterAlreadyExists", "Message": Name}},
+                    "PutParameter",
+                )
+            version = self.store(Name, Value, Type)
+            self.save()
+        return {"Version": version, "Tier": "Standard"}
+
+    def delete_parameter(self, Name):
+        self.call("DeleteParameter")
+        with self._lock:
+            if Name not in self._history:
+                raise self.not_found(Name, "DeleteParameter")
+            del self._history[Name]
+            self.save()
+        return {}
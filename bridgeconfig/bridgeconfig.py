@@ -1,9 +1,14 @@
 import json
 import logging
 import pickle
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from os.path import join
 
-import boto3
+from .metrics import instrumented, metrics
+from .throttle import RateLimitedClient, ThrottlingError, rate_limiter  # noqa: F401
 
 EMPTY = object()
 
@@ -38,6 +43,9 @@ DEFAULT_CONVERSIONS = {
     None: lambda value: value,
 }
 
+# converted values of these types can be shared between callers safely
+IMMUTABLE_TYPES = (str, bytes, int, float, bool, type(None), frozenset)
+
 log = logging.getLogger("bridgeconfig")
 
 
@@ -46,46 +54,618 @@ def list_chunks(lst, chunk_size):
         yield lst[index : index + chunk_size]
 
 
+# compact record of a parameter that keeps only what the cache needs, the
+# mapping interface (param["Value"], param.get("Decrypted")) of the boto3
+# response dicts is kept so existing code using lookup[...] still works
+# ciphertext keeps the encrypted value of the decrypted SecureStrings, it is
+# what the snapshots store instead of the secret
+class Parameter(object):
+    __slots__ = ("name", "value", "type", "version", "decrypted", "ciphertext")
+
+    FIELDS = {
+        "Name": "name",
+        "Value": "value",
+        "Type": "type",
+        "Version": "version",
+        "Decrypted": "decrypted",
+    }
+
+    def __init__(
+        self,
+        name,
+        value,
+        type="String",
+        version=None,
+        decrypted=False,
+        ciphertext=None,
+    ):
+        # names and types are interned so the records, lookup and index share
+        # the same string objects
+        self.name = sys.intern(name)
+        self.value = value
+        self.type = sys.intern(type)
+        self.version = version
+        self.decrypted = decrypted
+        self.ciphertext = ciphertext
+
+    @classmethod
+    def from_response(cls, param):
+        if isinstance(param, cls):
+            return param
+        return cls(
+            param["Name"],
+            param["Value"],
+            param.get("Type", "String"),
+            param.get("Version"),
+            bool(param.get("Decrypted")),
+        )
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, self.FIELDS[key])
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, self.FIELDS[key], value)
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def get(self, key, default=None):
+        return getattr(self, self.FIELDS[key]) if key in self.FIELDS else default
+
+    def replace(self, **fields):
+        values = {field: getattr(self, field) for field in self.__slots__}
+        values.update(fields)
+        return Parameter(**values)
+
+    def __repr__(self):
+        return "Parameter({!r}, type={!r}, version={!r})".format(
+            self.name, self.type, self.version
+        )
+
+
+# names split by "/" so subtrees (db/..., tenants/<id>/...) are found without
+# scanning all the parameters, path is set on the nodes that are parameters
+class PrefixTree(object):
+    __slots__ = ("children", "path")
+
+    def __init__(self):
+        self.children = {}
+        self.path = None
+
+    def insert(self, name, path):
+        node = self
+        for part in name.split("/"):
+            node = node.children.setdefault(part, PrefixTree())
+        node.path = path
+
+    def find(self, prefix):
+        node = self
+        for part in filter(None, prefix.split("/")):
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def iter_paths(self, name=""):
+        if self.path is not None:
+            yield name, self.path
+        for part, child in self.children.items():
+            yield from child.iter_paths("{}/{}".format(name, part) if name else part)
+
+    def to_dict(self, get_value):
+        # when a name is both a parameter and a prefix of other parameters
+        # (db and db/host) the nested values win
+        return {
+            part: child.to_dict(get_value) if child.children else get_value(child.path)
+            for part, child in self.children.items()
+        }
+
+
+# the cache published by update_cache. Readers take it without locks so it is
+# never modified once published, the parameters fetched or decrypted later are
+# added to a copy that replaces it (the tree, converted values and missing
+# parameters are memos shared with the copies)
+class CacheState(object):
+    __slots__ = (
+        "parameters",
+        "lookup",
+        "names",
+        "index",
+        "generation",
+        "tree",
+        "converted",
+        "not_found",
+    )
+
+    def __init__(
+        self,
+        parameters,
+        lookup,
+        names,
+        index,
+        generation,
+        tree=None,
+        converted=None,
+        not_found=None,
+    ):
+        self.parameters = parameters
+        self.lookup = lookup
+        self.names = names
+        self.index = index
+        self.generation = generation
+        self.tree = tree
+        self.converted = {} if converted is None else converted
+        self.not_found = {} if not_found is None else not_found
+
+    def replace(self, records):
+        # copy with the records added, or replacing the ones with the same name
+        records = {param.name: param for param in records}
+        parameters = [records.get(param.name, param) for param in self.parameters]
+        parameters.extend(
+            param for name, param in records.items() if name not in self.lookup
+        )
+        lookup = dict(self.lookup)
+        lookup.update(records)
+        index = dict(self.index)
+        for name in records:
+            index[name] = index[name[1:]] = name
+        return CacheState(
+            parameters,
+            lookup,
+            self.names,
+            index,
+            self.generation,
+            self.tree,
+            self.converted,
+            self.not_found,
+        )
+
+
+# concurrent calls with the same key run func once, the callers arriving while
+# it is in flight wait for it and get the same result (or exception)
+class SingleFlight(object):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        # returns the result and whether it was shared with a call in flight
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as exc:
+            self.done(key)
+            future.set_exception(exc)
+            raise
+        self.done(key)
+        future.set_result(result)
+        return result, False
+
+    def done(self, key):
+        with self._lock:
+            del self._calls[key]
+
+
+def rate_limited(client, limiter):
+    if limiter is None or isinstance(client, RateLimitedClient):
+        return client
+    return RateLimitedClient(client, limiter)
+
+
+# with a rate limiter botocore doesn't retry, the throttled calls are retried
+# by RateLimitedClient so every request takes a token from the bucket
+def ssm_client(region_name, limiter):
+    import boto3
+
+    if limiter is None:
+        return boto3.client("ssm", region_name=region_name)
+
+    from botocore.config import Config
+
+    return boto3.client(
+        "ssm", region_name=region_name, config=Config(retries={"max_attempts": 0})
+    )
+
+
+# every request sent to ssm (retries included) is reported to metrics
+def wrap_client(client, limiter, metrics):
+    if isinstance(client, RateLimitedClient):
+        return client
+    return rate_limited(instrumented(client, metrics), limiter)
+
+
+# process wide ssm clients (one per region, they are thread safe and keep their
+# own connection pool) and raw parameters of each prefix, so the instances of
+# different projects/environments share the common "All" prefixes. Prefixes
+# older than ttl seconds are fetched again instead of reused
+class Registry(object):
+    def __init__(self, limiter=rate_limiter, metrics=metrics, ttl=300):
+        self.limiter = limiter
+        self.metrics = metrics
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._prefixes = {}
+        self._prefix_locks = {}
+
+    def get_client(self, region_name):
+        with self._lock:
+            if region_name not in self._clients:
+                self._clients[region_name] = wrap_client(
+                    ssm_client(region_name, self.limiter),
+                    self.limiter,
+                    self.metrics,
+                )
+            return self._clients[region_name]
+
+    def get_prefix(self, client, path, fetch, reuse=True):
+        key = (client, path)
+        requested_at = time.time()
+        with self._lock:
+            lock = self._prefix_locks.setdefault(key, threading.Lock())
+
+        # concurrent requests for the same prefix wait for the one in flight
+        with lock:
+            entry = self._prefixes.get(key)
+            if (
+                entry is None
+                or (not reuse and entry[0] < requested_at)
+                or (self.ttl is not None and entry[0] < requested_at - self.ttl)
+            ):
+                fetched_at = time.time()
+                entry = self._prefixes[key] = (fetched_at, fetch(path))
+            return entry[1]
+
+    def fetched_at(self, client, path):
+        entry = self._prefixes.get((client, path))
+        return entry[0] if entry is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+            self._prefixes.clear()
+            self._prefix_locks.clear()
+
+
+registry = Registry()
+
+
 class BridgeConfig(object):
-    def __init__(self, project, environment, value=None, store_type="String"):
+    def __init__(
+        self,
+        project,
+        environment,
+        value=None,
+        store_type="String",
+        max_workers=4,
+        snapshot=None,
+        max_age=None,
+        on_refresh_error=None,
+        region_name="us-east-1",
+        registry=None,
+        negative_ttl=60,
+        client=None,
+        rate_limiter=rate_limiter,
+        metrics=metrics,
+    ):
         self.project = project
         self.environment = environment
-        self.client = boto3.client("ssm", region_name="us-east-1")
+        self.max_workers = max_workers
+        self.snapshot = snapshot
+        self.max_age = max_age
+        self.on_refresh_error = on_refresh_error
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread = None
+        self.region_name = region_name
+        self.registry = registry
+        self.negative_ttl = negative_ttl
+        self._state = None
+        self._next_refresh = None
+        self._write_lock = threading.Lock()
+        self.flights = SingleFlight()
+        self.metrics = metrics
+        self.tags = {"project": project, "environment": environment}
+        self.rate_limiter = rate_limiter
+        self._client_lock = threading.Lock()
+        self._client = None
+        if client is not None:
+            self._client = wrap_client(client, rate_limiter, metrics)
+
+    # boto3 is imported and the client created on the first call to ssm, so
+    # instances served from a snapshot never pay for it
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self.create_client()
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    def create_client(self):
+        if self.registry is not None:
+            return self.registry.get_client(self.region_name)
+
+        return wrap_client(
+            ssm_client(self.region_name, self.rate_limiter),
+            self.rate_limiter,
+            self.metrics,
+        )
+
+    def single_flight(self, key, func, *args, **kwargs):
+        result, shared = self.flights.do(key, func, *args, **kwargs)
+        if shared:
+            self.metrics.incr("cache.coalesced", tags=dict(self.tags, operation=key[0]))
+        return result
+
+    def map(self, func, items):
+        items = list(items)
+        if not self.max_workers or self.max_workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(items))
+        ) as executor:
+            return list(executor.map(func, items))
 
     def get_param_name(self, path):
         return path.lstrip("/").split("/", 2)[-1]
 
-    def refresh_cache(self):
+    def build_index(self, lookup):
+        # every form accepted by get_parameter (key, environment/key,
+        # project/environment/key and /project/environment/key) mapped to the
+        # full path that wins by search path precedence
+        precedence = {prefix: rank for rank, prefix in enumerate(self.search_path)}
+        paths = sorted(
+            (precedence.get("/".join(path.split("/", 3)[:3]) + "/", -1), path)
+            for path in lookup
+        )
+
+        index = {}
+        names = {}
+        partials = {}
+        for rank, path in paths:
+            index[path] = index[path[1:]] = path
+            if rank < 0:
+                continue
+            _, environment, name = path[1:].split("/", 2)
+            names[name] = path
+            if "/" not in name:
+                partials["{}/{}".format(environment, name)] = path
+        index.update(partials)
+        index.update(names)
+        return names, index
+
+    def update_cache(self, parameters, fetched_at=None):
+        parameters = [Parameter.from_response(parm) for parm in parameters]
+        lookup = {parm.name: parm for parm in parameters}
+        names, index = self.build_index(lookup)
+        fetched_at = time.time() if fetched_at is None else fetched_at
+
+        with self._write_lock:
+            previous = self._state
+            state = CacheState(
+                parameters,
+                lookup,
+                names,
+                index,
+                previous.generation + 1 if previous is not None else 1,
+            )
+            # set before the state so readers never see the new values expired
+            self._next_refresh = (
+                fetched_at + self.max_age if self.max_age is not None else None
+            )
+            self._state = state
+
+    def update_state(self, records):
+        # the records are published in a copy of the state, under the lock so
+        # concurrent updates and refreshes aren't lost
+        with self._write_lock:
+            self._state = self._state.replace(records)
+
+    def refresh_cache(self, incremental=False, reuse=False):
+        # refreshes requested while one is running (background or not) wait
+        # for it instead of fetching everything again
+        self.single_flight(("refresh",), self.fetch_cache, incremental, reuse)
+
+    def fetch_cache(self, incremental=False, reuse=False):
         log.debug("refreshing cache")
-        self._cache = self.get_raw_parameters()
-        self._lookup = {parm["Name"]: parm for parm in self._cache}
-        self._names = {self.get_param_name(path): path for path in self._lookup}
+        with self.metrics.timer("refresh.duration", self.tags):
+            parameters = self.get_raw_parameters(reuse=reuse)
+            if incremental and self._state is not None:
+                parameters = self.merge_parameters(parameters)
+            self.update_cache(parameters, self.prefixes_fetched_at())
+        self.save_snapshot()
+
+    def prefixes_fetched_at(self):
+        # reused prefixes were fetched before the refresh, the cache is as old
+        # as the oldest of them so max_age still applies
+        if self.registry is None:
+            return None
+        fetched_at = [
+            self.registry.fetched_at(self.client, path) for path in self.search_path
+        ]
+        fetched_at = [value for value in fetched_at if value is not None]
+        return min(fetched_at) if fetched_at else None
+
+    def is_same_version(self, cached, param):
+        version = cached.get("Version")
+        if version is None or version != param.get("Version"):
+            return False
+        if "LastModifiedDate" in cached and "LastModifiedDate" in param:
+            return cached["LastModifiedDate"] == param["LastModifiedDate"]
+        return True
+
+    def merge_parameters(self, parameters):
+        # keep the cached (and maybe already decrypted) unchanged parameters,
+        # only the changed ones that were decrypted are decrypted again
+        lookup = self._state.lookup
+        merged = []
+        pending_to_decrypt = {}
+        for param in parameters:
+            cached = lookup.get(param["Name"])
+            if cached is not None and self.is_same_version(cached, param):
+                if cached.decrypted and cached.ciphertext is None:
+                    # fetched already decrypted, ssm just returned it encrypted
+                    cached = cached.replace(ciphertext=param["Value"])
+                merged.append(cached)
+                continue
+            if cached is not None and cached.get("Decrypted"):
+                pending_to_decrypt[param["Name"]] = len(merged)
+            merged.append(param)
+
+        log.debug(
+            "incremental refresh: {} unchanged, {} to decrypt".format(
+                len(merged) - len(pending_to_decrypt), len(pending_to_decrypt)
+            )
+        )
+        values, _ = self.fetch_decrypted(list(pending_to_decrypt))
+        # the fetched records may be shared through the registry, decrypted
+        # values go to copies
+        for name, value in values.items():
+            position = pending_to_decrypt[name]
+            param = Parameter.from_response(merged[position])
+            merged[position] = param.replace(
+                value=value, decrypted=True, ciphertext=param.value
+            )
+        return merged
+
+    def load_cache(self):
+        if self._state is not None:
+            return
+        if self.snapshot is not None:
+            snapshot = self.snapshot.load(self.project, self.environment)
+            if snapshot is not None:
+                fetched_at, parameters = snapshot
+                self.update_cache(parameters, fetched_at)
+                return
+        self.refresh_cache(reuse=True)
+
+    def save_snapshot(self):
+        if self.snapshot is not None:
+            self.snapshot.save(self.project, self.environment, self._state.parameters)
+
+    @property
+    def is_cache_expired(self):
+        return self._next_refresh is not None and time.time() >= self._next_refresh
+
+    def check_cache(self):
+        if self._state is None:
+            # the first readers wait for the same load
+            self.single_flight(("load",), self.load_cache)
+        elif self.is_cache_expired:
+            # keep serving the current values while the refresh is running
+            self.refresh_cache_in_background()
+
+    def refresh_cache_in_background(self):
+        with self._refresh_lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return False
+            self._refresh_thread = threading.Thread(
+                target=self.background_refresh, name="bridgeconfig-refresh"
+            )
+            self._refresh_thread.daemon = True
+            self._refresh_thread.start()
+        return True
+
+    def background_refresh(self):
+        try:
+            self.refresh_cache(incremental=True)
+        except Exception as exc:
+            log.exception("unable to refresh the cache in background")
+            self.metrics.incr("refresh.errors", tags=self.tags)
+            # don't retry on every read while ssm keeps failing
+            self._next_refresh = time.time() + min(self.max_age, 60)
+            if self.on_refresh_error is not None:
+                self.on_refresh_error(exc)
+
+    # changes every time the cache is replaced, values derived from the cache
+    # (like the resolved settings) are valid while it doesn't change
+    @property
+    def generation(self):
+        return self.state.generation
+
+    @property
+    def state(self):
+        self.check_cache()
+        return self._state
 
     @property
     def cache(self):
-        if not hasattr(self, "_cache"):
-            self.refresh_cache()
-        return self._cache
+        return self.state.parameters
 
     @property
     def lookup(self):
-        if not hasattr(self, "_lookup"):
-            self.refresh_cache()
-        return self._lookup
+        return self.state.lookup
 
     @property
     def names(self):
-        if not hasattr(self, "_names"):
-            self.refresh_cache()
-        return self._names
+        return self.state.names
+
+    @property
+    def index(self):
+        return self.state.index
+
+    @property
+    def tree(self):
+        return self.get_tree(self.state)
+
+    def get_tree(self, state):
+        tree = state.tree
+        if tree is None:
+            tree = PrefixTree()
+            for name, path in state.names.items():
+                tree.insert(name, path)
+            state.tree = tree
+        return tree
+
+    def list_keys(self, prefix=""):
+        node = self.tree.find(prefix)
+        if node is None:
+            return []
+        return sorted(name for name, _ in node.iter_paths(prefix.strip("/")))
+
+    def get_subtree(self, prefix, type=None, decrypt=True, shared=False):
+        state = self.state
+        node = self.get_tree(state).find(prefix)
+        if node is None:
+            return {}
+        records = [state.lookup[path] for _, path in node.iter_paths()]
+        if decrypt:
+            records = self.decrypt_records(records)
+        records = {param.name: param for param in records}
+        return node.to_dict(
+            lambda path: self.convert_record(records[path], type, shared)
+        )
+
+    def resolve(self, path, state=None):
+        index = (state or self.state).index
+        fullpath = index.get(path)
+        if fullpath is None and path.startswith("/"):
+            fullpath = index.get(path[1:])
+        return fullpath
 
     @property
     def still_encrypted(self):
+        state = self.state
         return {
             name: path
-            for name, path in self.names.items()
-            if self.lookup[path]["Type"] == "SecureString"
-            and not self.lookup[path].get("Decrypted")
+            for name, path in state.names.items()
+            if state.lookup[path].type == "SecureString"
+            and not state.lookup[path].decrypted
         }
 
     @property
@@ -104,58 +684,159 @@ class BridgeConfig(object):
             for env in self.environment_search_path
         ]
 
-    def get_raw_parameters(self, decrypt=False):
-        result = []
+    def iter_path_pages(self, path, decrypt=False):
+        raw_paramters = {}
+
+        while True:
+            payload = {
+                "Path": path,
+                "Recursive": True,
+                "WithDecryption": decrypt,
+            }
+
+            if "NextToken" in raw_paramters:
+                payload["NextToken"] = raw_paramters["NextToken"]
+
+            raw_paramters = self.client.get_parameters_by_path(**payload)
+            self.metrics.incr("ssm.pages", tags=self.tags)
+
+            page = [Parameter.from_response(x) for x in raw_paramters["Parameters"]]
+            if decrypt:
+                for param in page:
+                    param.decrypted = param.type == "SecureString"
+            yield page
 
-        for path in self.search_path:
-            raw_paramters = {}
+            if "NextToken" not in raw_paramters:
+                break
 
-            while True:
-                payload = {
-                    "Path": path,
-                    "Recursive": True,
-                    "WithDecryption": decrypt,
-                }
+    def get_path_parameters(self, path, decrypt=False):
+        result = []
+        for page in self.iter_path_pages(path, decrypt):
+            result.extend(page)
+        return result
 
-                if "NextToken" in raw_paramters:
-                    payload["NextToken"] = raw_paramters["NextToken"]
+    def iter_parameters(self, decrypt=False, paths=None):
+        # parameters of the prefixes (search path by default, in order) as ssm
+        # returns them page by page, the SecureStrings are decrypted by the same
+        # request with decrypt and nothing is kept in the cache
+        for path in self.search_path if paths is None else paths:
+            for page in self.iter_path_pages(path, decrypt):
+                yield from page
 
-                raw_paramters = self.client.get_parameters_by_path(**payload)
+    def get_prefix_parameters(self, path, decrypt=False, reuse=False):
+        # decrypted values are never shared between instances
+        if self.registry is None or decrypt:
+            return self.get_path_parameters(path, decrypt)
+        return self.registry.get_prefix(
+            self.client, path, self.get_path_parameters, reuse=reuse
+        )
 
-                for x in raw_paramters["Parameters"]:
-                    result.append(x)
+    def get_raw_parameters(self, decrypt=False, reuse=False):
+        # prefixes are fetched concurrently (up to max_workers at a time) but
+        # results are merged back in search_path order to keep precedence
+        result = []
 
-                if "NextToken" not in raw_paramters:
-                    break
+        for parameters in self.map(
+            lambda path: self.get_prefix_parameters(path, decrypt, reuse),
+            self.search_path,
+        ):
+            result.extend(parameters)
 
         return result
 
     def is_encrypted(self, path, default=None):
-        if path in self.names:
-            path = self.names[path]
-        return self.lookup[path]["Type"] == "SecureString"
+        state = self.state
+        return state.lookup[self.resolve(path, state) or path].type == "SecureString"
+
+    def read_decrypted(self, responses):
+        values = {}
+        invalid = []
+        for response in responses:
+            for param in response["Parameters"]:
+                values[param["Name"]] = param["Value"]
+            invalid.extend(response.get("InvalidParameters", []))
+
+        if invalid:
+            log.warning("unable to decrypt parameters: {}".format(", ".join(invalid)))
+        return values, invalid
+
+    def fetch_decrypted(self, paths):
+        # chunks of 10 (GetParameters limit) sent concurrently up to max_workers
+        if paths:
+            self.metrics.incr("decrypt.batches", (len(paths) + 9) // 10, self.tags)
+            self.metrics.incr("decrypt.parameters", len(paths), self.tags)
+        return self.read_decrypted(
+            self.map(
+                lambda chunk: self.single_flight(
+                    ("decrypt", tuple(chunk)),
+                    self.client.get_parameters,
+                    Names=chunk,
+                    WithDecryption=True,
+                ),
+                list_chunks(paths, 10),
+            )
+        )
+
+    def get_pending_to_decrypt(self, parameters=None):
+        if parameters is None:
+            return list(self.still_encrypted.values())
+        # names or full paths, including the parameters fetched outside of the
+        # search path which aren't in names
+        state = self.state
+        pending = {}
+        for name in parameters:
+            path = state.names.get(name, name)
+            param = state.lookup.get(path)
+            if param is not None and param.type == "SecureString":
+                if not param.decrypted:
+                    pending[path] = None
+        return list(pending)
+
+    def set_decrypted(self, values):
+        with self._write_lock:
+            state = self._state
+            records = [
+                state.lookup[name].replace(
+                    value=value, decrypted=True, ciphertext=state.lookup[name].value
+                )
+                for name, value in values.items()
+                if name in state.lookup and not state.lookup[name].decrypted
+            ]
+            if records:
+                self._state = state.replace(records)
+        if values and self.snapshot is not None and self.snapshot.include_secrets:
+            self.save_snapshot()
 
     def decrypt_parameters(self, parameters=None):
-        parameters = self.names if parameters is None else parameters
-        pending_to_decrypt = [
-            path
-            for name, path in self.still_encrypted.items()
-            if name in parameters or path in parameters
+        pending_to_decrypt = self.get_pending_to_decrypt(parameters)
+        if not pending_to_decrypt:
+            return []
+
+        values, invalid = self.fetch_decrypted(pending_to_decrypt)
+        self.set_decrypted(values)
+        return invalid
+
+    def decrypt_records(self, records):
+        # the decrypted values are published in a new state, its records are
+        # returned (or the given ones when a refresh dropped them meanwhile)
+        pending = [
+            param.name
+            for param in records
+            if param.type == "SecureString" and not param.decrypted
         ]
-        if pending_to_decrypt:
-            for params_chunk in list_chunks(pending_to_decrypt, 10):
-                for param in self.client.get_parameters(
-                    Names=params_chunk, WithDecryption=True
-                )["Parameters"]:
-                    self.lookup[param["Name"]]["Value"] = param["Value"]
-                    self.lookup[param["Name"]]["Decrypted"] = True
+        if not pending:
+            return records
+        self.decrypt_parameters(pending)
+        lookup = self._state.lookup
+        return [lookup.get(param.name, param) for param in records]
 
     def get_all_parameters(self, decrypt=False, count=10, sorted=True):
         if decrypt:
             self.decrypt_parameters()
+        state = self.state
         parameters = [
-            {"name": self.lookup[path]["Name"], "value": self.lookup[path]["Value"]}
-            for path in self.names.values()
+            {"name": state.lookup[path].name, "value": state.lookup[path].value}
+            for path in state.names.values()
         ]
         if sorted:
 
@@ -195,50 +876,220 @@ class BridgeConfig(object):
         else:
             yield from (join(base, path) for base in reversed(self.search_path))
 
-    def get_parameter(
-        self, path, type=None, decrypt=True, default=EMPTY, include_path=False
-    ):
-        if path in self.names:
-            search_path = [self.names[path]]
-        elif path in self.lookup:
-            search_path = [path]
-        else:
-            search_path = list(self.parameter_sarch_path(path))
+    def find_parameter(self, path):
+        search_path, param = self.find_record(path)
+        return search_path, param.name if param is not None else None
 
+    def find_record(self, path):
+        # a single state is used, a refresh may publish another one meanwhile
+        state = self.state
+        fullpath = self.resolve(path, state)
+        if fullpath is not None:
+            return [fullpath], state.lookup[fullpath]
+
+        search_path = list(self.parameter_sarch_path(path))
         log.debug(
             "getting parameter: {} with search paths {}".format(path, search_path)
         )
 
+        # parameters fetched from ssm after the last refresh aren't indexed
         for fullpath in search_path:
-            if fullpath in self.lookup:
-                if decrypt:
-                    self.decrypt_parameters([fullpath])
-                value = self.lookup[fullpath]["Value"]
-                break
+            param = state.lookup.get(fullpath)
+            if param is not None:
+                return search_path, param
+        return search_path, None
+
+    def fetch_parameter(self, search_path, decrypt=True):
+        now = time.time()
+        not_found = self._state.not_found
+        for fullpath in search_path:
+            if not_found.get(fullpath, 0) > now:
+                log.debug("parameter: {} known to be missing".format(fullpath))
+                self.metrics.incr("cache.negative_hits", tags=self.tags)
+                continue
+            # readers missing the same parameter share a single GetParameter
+            param = self.single_flight(
+                ("get_parameter", fullpath, decrypt),
+                self.get_ssm_parameter,
+                fullpath,
+                decrypt,
+            )
+            if param is not None:
+                return param
+        return None
+
+    def get_ssm_parameter(self, fullpath, decrypt=True):
+        try:
+            param = self.client.get_parameter(Name=fullpath, WithDecryption=decrypt)[
+                "Parameter"
+            ]
+        except self.client.exceptions.ParameterNotFound:
+            log.debug("parameter: {} Not Found in ssm".format(fullpath))
+            if self.negative_ttl:
+                self._state.not_found[fullpath] = time.time() + self.negative_ttl
+            return None
+        return self.add_parameter(param, decrypt)
+
+    def add_parameter(self, param, decrypt):
+        return self.add_parameters([param], decrypt)[0]
+
+    def add_parameters(self, parameters, decrypt):
+        records = []
+        for param in parameters:
+            param = Parameter.from_response(param)
+            if decrypt and param.type == "SecureString":
+                param = param.replace(decrypted=True)
+            records.append(param)
+        if records:
+            self.update_state(records)
+        return records
+
+    def fetch_parameters(self, paths, decrypt=True):
+        now = time.time()
+        not_found = self._state.not_found
+        known = len(paths)
+        paths = [path for path in paths if not_found.get(path, 0) <= now]
+        if known > len(paths):
+            self.metrics.incr("cache.negative_hits", known - len(paths), self.tags)
+        found = {}
+        for records in self.map(
+            lambda chunk: self.single_flight(
+                ("get_parameters", tuple(chunk), decrypt),
+                self.get_ssm_parameters,
+                chunk,
+                decrypt,
+            ),
+            list_chunks(paths, 10),
+        ):
+            found.update((param.name, param) for param in records)
+        return found
+
+    def get_ssm_parameters(self, names, decrypt=True):
+        response = self.client.get_parameters(Names=names, WithDecryption=decrypt)
+        if self.negative_ttl:
+            expires = time.time() + self.negative_ttl
+            for path in response.get("InvalidParameters", []):
+                self._state.not_found[path] = expires
+        return self.add_parameters(response["Parameters"], decrypt)
+
+    def convert_record(self, param, type=None, shared=False):
+        return self.convert(param.value, type, param.name, shared, param.version)
+
+    def convert(self, value, type=None, fullpath=None, shared=False, version=None):
+        if callable(type):
+            # not kept, a new function on every call would fill the memo
+            return type(value)
+        converter = DEFAULT_CONVERSIONS.get(type, DEFAULT_CONVERSIONS[None])
+        if fullpath is None:
+            return converter(value)
+
+        # the raw value is kept to tell apart encrypted/decrypted values of the
+        # same version, mutable results are only reused when shared is requested
+        converted_values = self._state.converted
+        key = (fullpath, converter, version)
+        cached = converted_values.get(key)
+        if cached is not None and cached[0] is value:
+            if shared or isinstance(cached[1], IMMUTABLE_TYPES):
+                return cached[1]
+
+        converted = converter(value)
+        if shared or isinstance(converted, IMMUTABLE_TYPES):
+            converted_values[key] = (value, converted)
+        return converted
+
+    def get_parameter(
+        self,
+        path,
+        type=None,
+        decrypt=True,
+        default=EMPTY,
+        include_path=False,
+        shared=False,
+    ):
+        search_path, param = self.find_record(path)
+
+        if param is not None:
+            self.metrics.incr("cache.hits", tags=self.tags)
+            if decrypt:
+                param = self.decrypt_records([param])[0]
         else:
-            for fullpath in search_path:
-                try:
-                    param = self.client.get_parameter(
-                        Name=fullpath, WithDecryption=decrypt
-                    )["Parameter"]
-                    if decrypt and param["Type"] == "SecureString":
-                        param["Decrypted"] = True
-                    self._cache.append(param)
-                    self.lookup[param["Name"]] = param
-                    value = param["Value"]
-                    break
-                except self.client.exceptions.ParameterNotFound:
-                    log.debug("parameter: {} Not Found in ssm".format(fullpath))
-            else:
+            self.metrics.incr("cache.misses", tags=self.tags)
+            param = self.fetch_parameter(search_path, decrypt)
+            if param is None:
                 if default is EMPTY:
                     raise ParameterNotFound(path, search_path)
                 return (None, default) if include_path else default
 
-        if callable(type):
-            value = type(value)
-        else:
-            value = DEFAULT_CONVERSIONS.get(type, DEFAULT_CONVERSIONS[None])(value)
-        return (fullpath, value) if include_path else value
+        value = self.convert_record(param, type, shared)
+        return (param.name, value) if include_path else value
+
+    def get_parameters(
+        self,
+        keys,
+        types=None,
+        decrypt=True,
+        default=EMPTY,
+        include_path=False,
+        shared=False,
+    ):
+        # keys not in the cache are fetched together with GetParameters (10
+        # names per call) instead of one GetParameter per key and candidate
+        types = types if isinstance(types, dict) else dict.fromkeys(keys, types)
+        found = {}
+        missing = {}
+        for key in keys:
+            search_path, param = self.find_record(key)
+            if param is None:
+                missing[key] = search_path
+            else:
+                found[key] = param
+
+        if found:
+            self.metrics.incr("cache.hits", len(found), self.tags)
+        if missing:
+            self.metrics.incr("cache.misses", len(missing), self.tags)
+            candidates = list(
+                dict.fromkeys(path for paths in missing.values() for path in paths)
+            )
+            fetched = self.fetch_parameters(candidates, decrypt)
+            for key, search_path in missing.items():
+                for fullpath in search_path:
+                    if fullpath in fetched:
+                        found[key] = fetched[fullpath]
+                        break
+
+        if decrypt and found:
+            found = dict(zip(found, self.decrypt_records(list(found.values()))))
+
+        result = {}
+        for key in keys:
+            if key in found:
+                fullpath = found[key].name
+                value = self.convert_record(found[key], types.get(key), shared)
+            elif default is EMPTY:
+                raise ParameterNotFound(key, missing[key])
+            else:
+                fullpath, value = None, default
+            result[key] = (fullpath, value) if include_path else value
+        return result
+
+    def get_parameter_history(self, path, decrypt=False):
+        fullpath = self.resolve(path) or self.get_full_path(path)
+        result = []
+        response = {}
+
+        while True:
+            payload = {"Name": fullpath, "WithDecryption": decrypt}
+            if "NextToken" in response:
+                payload["NextToken"] = response["NextToken"]
+
+            response = self.client.get_parameter_history(**payload)
+            result.extend(response["Parameters"])
+
+            if "NextToken" not in response:
+                break
+
+        return result
 
     def set_parameter(self, path, value, type="String"):
         fullpath = self.get_full_path(path)
@@ -246,6 +1097,58 @@ class BridgeConfig(object):
             Name=fullpath, Value=value, Type=type, Overwrite=True
         )
 
+    def get_current_parameters(self, fullpaths):
+        # decrypted value and type of the existing parameters, 10 per request
+        current = {}
+        for response in self.map(
+            lambda chunk: self.client.get_parameters(Names=chunk, WithDecryption=True),
+            list_chunks(fullpaths, 10),
+        ):
+            for param in response["Parameters"]:
+                current[param["Name"]] = (param["Value"], param["Type"])
+        return current
+
+    def plan_parameters(self, parameters, type=None):
+        # values are either a value or a (value, type) tuple, only the
+        # parameters whose value or type differ from ssm are returned as
+        # {fullpath: (value, type, "create" | "update")}. Without a type the
+        # existing parameters keep theirs and the new ones are Strings
+        wanted = {}
+        for path, value in parameters.items():
+            wanted[self.get_full_path(path)] = (
+                value if isinstance(value, tuple) else (value, type)
+            )
+
+        current = self.get_current_parameters(list(wanted))
+        plan = {}
+        for fullpath, (value, value_type) in wanted.items():
+            if fullpath not in current:
+                plan[fullpath] = (value, value_type or "String", "create")
+                continue
+            value_type = value_type or current[fullpath][1]
+            if current[fullpath] != (value, value_type):
+                plan[fullpath] = (value, value_type, "update")
+        log.debug(
+            "{} parameters to write, {} unchanged".format(
+                len(plan), len(wanted) - len(plan)
+            )
+        )
+        return plan
+
+    def set_parameters(self, parameters, type=None, dry_run=False):
+        # the changed parameters are written concurrently (up to max_workers,
+        # through the rate limiter), unchanged ones are skipped so their
+        # history isn't touched
+        plan = self.plan_parameters(parameters, type)
+        if not dry_run:
+            self.map(
+                lambda item: self.client.put_parameter(
+                    Name=item[0], Value=item[1][0], Type=item[1][1], Overwrite=True
+                ),
+                plan.items(),
+            )
+        return plan
+
     def delete_paramter(self, path):
         fullpath = self.get_full_path(path)
         try:
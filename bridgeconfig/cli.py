@@ -1,15 +1,24 @@
+import hashlib
+import hmac
+import json
 import logging
 import os
+import re
 import sys
 from functools import wraps
 
-import botocore.exceptions
 import click
 from click.globals import get_current_context
-from termcolor import colored
-from terminaltables import SingleTable
 
-from .bridgeconfig import BridgeConfig
+from .bridgeconfig import BridgeConfig, registry
+from .throttle import ThrottlingError, error_code
+
+ACCESS_DENIED_CODES = (
+    "AccessDenied",
+    "AccessDeniedException",
+    "UnauthorizedOperation",
+    "UnrecognizedClientException",
+)
 
 
 def print_table(headers, rows, empty_table_msg="No values found"):
@@ -19,6 +28,8 @@ def print_table(headers, rows, empty_table_msg="No values found"):
         print(empty_table_msg)  # noqa
         return
 
+    from terminaltables import SingleTable
+
     print(SingleTable([headers] + rows).table)  # noqa
 
 
@@ -31,7 +42,7 @@ def pass_bridgeconfig(func):
 
 
 def complete_registered_projects(ctx, args, incomplete):
-    bc = BridgeConfig("bridgeconfig", "All")
+    bc = BridgeConfig("bridgeconfig", "All", registry=registry)
     return [
         pjt
         for pjt in sorted(
@@ -43,10 +54,35 @@ def complete_registered_projects(ctx, args, incomplete):
 
 
 def error_message(message):
+    from termcolor import colored
+
     print(colored(message, "yellow", "on_red"))  # noqa
     sys.exit(1)
 
 
+def handle_ssm_errors(access_denied_message):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except ThrottlingError:
+                error_message("AWS SSM is throttling the requests, try again later")
+            except Exception as exc:
+                # botocore ClientError, told apart by its error code so botocore
+                # isn't imported before the first call
+                code = error_code(exc)
+                if code is None:
+                    raise
+                if code in ACCESS_DENIED_CODES:
+                    error_message(access_denied_message)
+                error_message(str(exc))
+
+        return wrapper
+
+    return decorator
+
+
 @click.group()
 @click.option(
     "--verbose",
@@ -93,7 +129,7 @@ def cli(ctx, verbose, project, environment):
 
             project = get_app_name()
 
-        bc = BridgeConfig(project, environment)
+        bc = BridgeConfig(project, environment, registry=registry)
     else:
         bc = None
 
@@ -113,21 +149,18 @@ def version():
 @click.argument("keys", nargs=-1)
 @click.option("-x", "--decrypt", help="decrypt parameters on listing", is_flag=True)
 @pass_bridgeconfig
+@handle_ssm_errors(
+    "you don't have permissions to access this project/environment combination"
+)
 def show_paramters(bc, keys, decrypt):
-    try:
-        if not keys:
-            parameters = [
-                (p["name"], p["value"]) for p in bc.get_all_parameters(decrypt=decrypt)
-            ]
-        else:
-            parameters = [
-                bc.get_parameter(key, decrypt=decrypt, include_path=True)
-                for key in keys
-            ]
-    except botocore.exceptions.ClientError:
-        error_message(
-            "you don't have permissions to access this project/environment combination"
-        )
+    if not keys:
+        parameters = [
+            (p["name"], p["value"]) for p in bc.get_all_parameters(decrypt=decrypt)
+        ]
+    else:
+        parameters = bc.get_parameters(
+            keys, decrypt=decrypt, default=None, include_path=True
+        ).values()
 
     print_table(
         ("Path", "Value"),
@@ -146,24 +179,22 @@ def show_paramters(bc, keys, decrypt):
 @click.argument("key")
 @click.option("-x", "--decrypt", help="decrypt parameters on listing", is_flag=True)
 @pass_bridgeconfig
+@handle_ssm_errors(
+    "you don't have permissions to access the history of this project/environment combination"
+)
 def show_paramter_history(bc, key, decrypt):
-    try:
-        print_table(
-            ("Revision ID", "Value", "Modifier", "Last Modified"),
+    print_table(
+        ("Revision ID", "Value", "Modifier", "Last Modified"),
+        (
             (
-                (
-                    item["Version"],
-                    "<ENCRYPTED>" if not decrypt else item["Value"],
-                    item["LastModifiedUser"],
-                    item["LastModifiedDate"],
-                )
-                for item in bc.get_parameter_history(path=key, decrypt=decrypt)
-            ),
-        )
-    except botocore.exceptions.ClientError:
-        error_message(
-            "you don't have permissions to access the history of this project/environment combination"
-        )
+                item["Version"],
+                "<ENCRYPTED>" if not decrypt else item["Value"],
+                item["LastModifiedUser"],
+                item["LastModifiedDate"],
+            )
+            for item in bc.get_parameter_history(path=key, decrypt=decrypt)
+        ),
+    )
 
 
 @cli.command(name="set", help="add or modify an existing parameter")
@@ -177,44 +208,261 @@ def show_paramter_history(bc, key, decrypt):
 @click.argument("key")
 @click.argument("value")
 @pass_bridgeconfig
+@handle_ssm_errors(
+    "you don't have permissions to add/modify parameters on this project/environment combination"
+)
 def set_parameter(bc, type, key, value):
-    try:
-        bc.set_parameter(key, value, type)
-    except botocore.exceptions.ClientError:
-        error_message(
-            "you don't have permissions to add/modify parameters on this project/environment combination"
-        )
+    bc.set_parameter(key, value, type)
 
 
 @cli.command(name="delete", help="delete a parameter")
 @click.argument("key")
 @pass_bridgeconfig
+@handle_ssm_errors(
+    "you don't have permissions to delete parameters on this project/environment combination"
+)
 def delete_parameter(bc, key):
-    try:
-        bc.delete_paramter(key)
-    except botocore.exceptions.ClientError:
-        error_message(
-            "you don't have permissions to delete parameters on this project/environment combination"
-        )
+    bc.delete_paramter(key)
 
 
 @cli.command(name="list", help="list available projects")
 @pass_bridgeconfig
+@handle_ssm_errors("you don't have permissions to access general parameters of Bridge")
 def list_projects(bc):
-    try:
-        print_table(
-            ("Project Name",),
-            (
-                (pjt,)
-                for pjt in bc.get_parameter(
-                    path="/bridgeconfig/All/Projects", type="csv"
-                )
-            ),
+    print_table(
+        ("Project Name",),
+        (
+            (pjt,)
+            for pjt in bc.get_parameter(path="/bridgeconfig/All/Projects", type="csv")
+        ),
+    )
+
+
+def split_name(name):
+    # /PJT/dev/db/host -> ("/PJT/dev/", "db/host")
+    _, project, environment, key = name.split("/", 3)
+    return "/{}/{}/".format(project, environment), key
+
+
+def rebase(bc, prefix):
+    # the project and environment levels of an exported prefix are moved to
+    # the ones of bc, the All levels are kept
+    project, environment = prefix.strip("/").split("/")
+    return "/{}/{}/".format(
+        project if project == "All" else bc.project,
+        environment if environment == "All" else bc.environment,
+    )
+
+
+# "/" is written as "__" (nested keys for dynaconf) and the other characters
+# not allowed in variable names as "_"
+def env_name(key):
+    return re.sub(r"[^A-Za-z0-9_]", "_", key.replace("/", "__"))
+
+
+def env_key(name):
+    return name.replace("__", "/")
+
+
+def export_env(prefix, key, param):
+    lines = []
+    if env_key(env_name(key)) != key:
+        # the original key can't be restored from the variable name
+        lines.append("# key {}".format(key))
+    if param.type != "String":
+        lines.append("# type {}".format(param.type))
+    lines.append("{}={}".format(env_name(key), json.dumps(param.value)))
+    return "\n".join(lines)
+
+
+# header written before the parameters of each prefix and serializer of the
+# parameters, all of them keep the prefix so import can rebase them
+EXPORT_FORMATS = {
+    "jsonl": (
+        None,
+        lambda prefix, key, param: json.dumps(
+            {
+                "name": param.name,
+                "prefix": prefix,
+                "key": key,
+                "value": param.value,
+                "type": param.type,
+                "version": param.version,
+            }
+        ),
+    ),
+    "env": (lambda prefix: "# prefix {}".format(prefix), export_env),
+    "toml": (
+        lambda prefix: "[{}]".format(json.dumps(prefix)),
+        lambda prefix, key, param: "{} = {{ value = {}, type = {} }}".format(
+            json.dumps(key), json.dumps(param.value), json.dumps(param.type)
+        ),
+    ),
+}
+
+
+@cli.command(name="export", help="write the parameters as they are fetched")
+@click.option(
+    "-f",
+    "--format",
+    "output_format",
+    default="jsonl",
+    type=click.Choice(sorted(EXPORT_FORMATS)),
+    help="output format (default: jsonl)",
+)
+@click.option("-x", "--decrypt", help="export decrypted SecureStrings", is_flag=True)
+@click.option(
+    "--path",
+    "paths",
+    multiple=True,
+    help="prefix to export, can be repeated (default: the search path)",
+)
+@click.option("-o", "--output", type=click.File("w"), default="-")
+@pass_bridgeconfig
+@handle_ssm_errors(
+    "you don't have permissions to access this project/environment combination"
+)
+def export_parameters(bc, output_format, decrypt, paths, output):
+    # streamed page by page, later prefixes of the search path override the
+    # previous ones when the env output is loaded
+    header, serialize = EXPORT_FORMATS[output_format]
+    current = None
+    for param in bc.iter_parameters(decrypt=decrypt, paths=paths or None):
+        if param.type == "SecureString" and not param.decrypted:
+            # encrypted values can't be restored, only listed in jsonl
+            if output_format != "jsonl":
+                continue
+            param.value = None
+        prefix, key = split_name(param.name)
+        if header is not None and prefix != current:
+            output.write(header(prefix) + "\n")
+            current = prefix
+        output.write(serialize(prefix, key, param) + "\n")
+
+
+def flatten(data, type, prefix=""):
+    # (key, (value, type)), the {value = ..., type = ...} tables are the
+    # parameters written by export
+    for key, value in data.items():
+        if isinstance(value, dict) and set(value) == {"value", "type"}:
+            yield prefix + key, (value["value"], value["type"])
+        elif isinstance(value, dict):
+            yield from flatten(value, type, "{}{}/".format(prefix, key))
+        elif isinstance(value, str):
+            yield prefix + key, (value, type)
+        else:
+            yield prefix + key, (json.dumps(value), type)
+
+
+def is_prefix(name):
+    return re.match(r"^/[^/]+/[^/]+/$", name) is not None
+
+
+def read_parameters(fp, input_format, type):
+    # (prefix, key, (value, type)) from the formats written by export, prefix
+    # is None for the keys written by hand. The type given is used for the
+    # parameters without one (None keeps the current type)
+    if input_format == "toml":
+        import toml
+
+        for name, value in toml.load(fp).items():
+            if isinstance(value, dict) and is_prefix(name):
+                for key, value in flatten(value, type):
+                    yield name, key, value
+            else:
+                for key, value in flatten({name: value}, type):
+                    yield None, key, value
+        return
+
+    prefix = None
+    comments = {}
+    for line in fp:
+        line = line.strip()
+        if not line:
+            continue
+        if input_format == "jsonl":
+            record = json.loads(line)
+            if record.get("value") is None:
+                continue
+            if "key" in record:
+                prefix, key = record.get("prefix"), record["key"]
+            elif record["name"].startswith("/"):
+                prefix, key = split_name(record["name"])
+            else:
+                prefix, key = None, record["name"]
+            yield prefix, key, (record["value"], record.get("type", type))
+            continue
+        if line.startswith("#"):
+            # "# prefix /PJT/dev/" applies to the next lines, "# key db.port"
+            # and "# type SecureString" to the next one
+            tag, _, value = line[1:].strip().partition(" ")
+            if tag == "prefix" and is_prefix(value.strip()):
+                prefix = value.strip()
+            elif tag in ("key", "type"):
+                comments[tag] = value.strip()
+            continue
+        name, _, value = line.partition("=")
+        value = value.strip()
+        if value.startswith('"'):
+            value = json.loads(value)
+        yield (
+            prefix,
+            comments.get("key", env_key(name.strip())),
+            (value, comments.get("type", type)),
         )
-    except botocore.exceptions.ClientError:
-        error_message(
-            "you don't have permissions to access general parameters of Bridge"
+        comments = {}
+
+
+@cli.command(name="import", help="add or modify the parameters of a file")
+@click.argument("input_file", type=click.File("r"))
+@click.option(
+    "-f",
+    "--format",
+    "input_format",
+    type=click.Choice(sorted(EXPORT_FORMATS)),
+    help="input format (default: guessed from the file extension, jsonl)",
+)
+@click.option(
+    "-t",
+    "--type",
+    type=click.Choice(("String", "SecureString"), case_sensitive=False),
+    help="type of the parameters without one (default: the current type, String)",
+)
+@click.option("--dry-run", is_flag=True, help="only show the planned changes")
+@pass_bridgeconfig
+@handle_ssm_errors(
+    "you don't have permissions to add/modify parameters on this project/environment combination"
+)
+def import_parameters(bc, input_file, input_format, type, dry_run):
+    if input_format is None:
+        # .env, backup.jsonl, settings.toml
+        extension = os.path.basename(input_file.name).rsplit(".", 1)[-1]
+        input_format = extension if extension in EXPORT_FORMATS else "jsonl"
+
+    # exported parameters are imported to the same level (All or not) of the
+    # project and environment given, the rest to the environment
+    parameters = {}
+    for prefix, key, value in read_parameters(input_file, input_format, type):
+        if prefix is None:
+            prefix = "/{}/{}/".format(bc.project, bc.environment)
+        parameters[rebase(bc, prefix) + key] = value
+
+    plan = bc.set_parameters(parameters, dry_run=dry_run)
+    print_table(
+        ("Path", "Type", "Change"),
+        [
+            (fullpath, value_type, action)
+            for fullpath, (_, value_type, action) in sorted(plan.items())
+        ],
+        empty_table_msg="No changes",
+    )
+    print(  # noqa
+        "{} {}, {} unchanged".format(
+            len(plan),
+            "to write" if dry_run else "written",
+            len(parameters) - len(plan),
         )
+    )
 
 
 @cli.command(
@@ -225,11 +473,45 @@ def list_projects(bc):
     "settings_path",
     envvar="SETTINGS_PATH",
 )
+@click.option(
+    "--freeze",
+    "freeze_path",
+    type=click.Path(dir_okay=False, writable=True),
+    help="write the resolved settings to a file (load it with BRIDGECONFIG_FROZEN)",
+)
+@click.option(
+    "--secrets",
+    default="reference",
+    type=click.Choice(("reference", "omit", "include")),
+    help="how to freeze the values of decrypted parameters (default: reference)",
+)
+@click.option(
+    "--check",
+    "check_path",
+    type=click.Path(exists=True, dir_okay=False),
+    help="check if the parameters of a frozen settings file changed",
+)
 @pass_bridgeconfig
-def show_conf(bc, settings_path):
+@handle_ssm_errors(
+    "you don't have permissions to access this project/environment combination"
+)
+def show_conf(bc, settings_path, freeze_path, secrets, check_path):
     from dynaconf import default_settings
 
-    from .conf import guess_settings_path, settings
+    from . import frozen
+    from .conf import create_settings, guess_settings_path
+
+    if check_path:
+        stale = frozen.check_stale(frozen.load(check_path))
+        print_table(
+            ("Key", "Frozen", "Current"),
+            [
+                (key, " ".join(map(str, old)), " ".join(map(str, new)))
+                for key, (old, new) in stale.items()
+            ],
+            empty_table_msg="{} is up to date".format(check_path),
+        )
+        sys.exit(1 if stale else 0)
 
     valid_filenames = ("settings.toml", "settings.local.toml")
 
@@ -246,6 +528,15 @@ def show_conf(bc, settings_path):
 
     os.environ["ENVIRONMENT"] = bc.environment
     guess_settings_path(allow_cwd=False)
+    settings = create_settings()
+
+    if freeze_path:
+        try:
+            artifact = frozen.freeze(settings, secrets)
+        except ValueError as exc:
+            error_message(str(exc))
+        frozen.dump(artifact, freeze_path)
+        return
 
     print_table(
         ("Key", "Value"),
@@ -258,10 +549,11 @@ def show_conf(bc, settings_path):
 
 
 class Param:
-    def __init__(self, name, value):
+    def __init__(self, name, value, digest=None):
         self.name = name
         self.value = value
-        _, self.project, self.env, self.key = name.split("/")
+        self.digest = digest
+        _, self.project, self.env, self.key = name.split("/", 3)
 
     def __str__(self):
         return self.key
@@ -291,18 +583,43 @@ class Param:
     ),
     nargs=-1,
 )
+@click.option(
+    "-v",
+    "--values",
+    is_flag=True,
+    help="compare the values (SecureStrings included) by hash",
+)
 @pass_bridgeconfig
-def show_diff(bc, environments):
+@handle_ssm_errors(
+    "you don't have permissions to access this project/environment combination"
+)
+def show_diff(bc, environments, values):
+    # the hashes are keyed with a random secret so the values (and secrets)
+    # can be compared but not guessed from the output
+    secret = os.urandom(16)
+
     def get_env_params(env):
-        return [
+        params = [
             p
             for p in (Param(**p) for p in env.get_all_parameters())
             if p.env == env.environment
         ]
+        if values:
+            env.decrypt_parameters([p.name for p in params])
+            for p in params:
+                p.digest = hmac.new(
+                    secret, env.lookup[p.name].value.encode(), hashlib.sha256
+                ).hexdigest()[:10]
+        return params
 
     envs = [bc]
-    envs += [BridgeConfig(bc.project, e) for e in environments if e != bc.environment]
-    keys = [get_env_params(env) for env in envs]
+    envs += [
+        BridgeConfig(bc.project, e, registry=registry)
+        for e in environments
+        if e != bc.environment
+    ]
+    # environments are fetched concurrently, the shared All prefixes once
+    keys = bc.map(get_env_params, envs)
 
     all_keys = set()
     for env_keys in keys:
@@ -310,10 +627,19 @@ def show_diff(bc, environments):
 
     headers = ("Keys",) + tuple(e.environment for e in envs)
 
-    print_table(
-        headers,
-        [
-            (k,) + tuple("X" if k in env_keys else "" for env_keys in keys)
-            for k in sorted(all_keys)
-        ],
-    )
+    if not values:
+        print_table(
+            headers,
+            [
+                (k,) + tuple("X" if k in env_keys else "" for env_keys in keys)
+                for k in sorted(all_keys)
+            ],
+        )
+        return
+
+    digests = [{p.key: p.digest for p in env_keys} for env_keys in keys]
+    rows = []
+    for k in sorted(all_keys):
+        row = [digests_by_key.get(k.key, "") for digests_by_key in digests]
+        rows.append([k] + row + ["X" if len(set(row)) > 1 else ""])
+    print_table(headers + ("Differs",), rows)
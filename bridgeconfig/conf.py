@@ -1,11 +1,15 @@
+import copy
 import os
+import threading
+from functools import wraps
 from os.path import dirname, exists, join
 
 import toml
 from dynaconf import LazySettings
+from dynaconf.utils.functional import empty
 from dynaconf.utils.parse_conf import LazyFormat, converters
 
-from .bridgeconfig import BridgeConfig
+from .bridgeconfig import IMMUTABLE_TYPES, BridgeConfig, log, registry, to_bool
 
 
 def guess_settings_path(envvar="SETTINGS_PATH", allow_cwd=True):
@@ -52,15 +56,128 @@ def evalute_lazy_recursive(settings, value):
     return value
 
 
+def find_lazy_values(value, formatter):
+    if isinstance(value, dict):
+        for item in dict.values(value):
+            yield from find_lazy_values(item, formatter)
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            yield from find_lazy_values(item, formatter)
+    elif getattr(value, "formatter", None) is formatter:
+        yield value.value
+
+
+# methods of the dynaconf settings that change the loaded values, the resolved
+# values are dropped when any of them is called
+RELOAD_METHODS = frozenset(
+    (
+        "clean",
+        "configure",
+        "execute_loaders",
+        "load_file",
+        "namespace",
+        "reload",
+        "set",
+        "setenv",
+        "unset",
+        "unset_all",
+        "update",
+    )
+)
+
+
 class Settings(LazySettings):
+    def __init__(self, prefetch_aws=False, **kwargs):
+        super().__init__(**kwargs)
+        self.__dict__["_resolved"] = {}
+        self.__dict__["_prefetch_aws"] = prefetch_aws
+
     def _setup(self):
         for k, v in self._kwargs.items():
             if callable(v):
                 self._kwargs[k] = v()
         super()._setup()
+        self.reset_resolved()
+        if self._prefetch_aws:
+            self.prefetch_aws()
+
+    def prefetch_aws(self):
+        values = list(find_lazy_values(self._wrapped.store, aws_formatter))
+        if not values:
+            return
+        try:
+            aws_formatter.prefetch(self, values)
+        except Exception:
+            # the values are still resolved (and fail) one by one on access
+            log.warning("unable to prefetch the @aws settings", exc_info=True)
+
+    def reset_resolved(self):
+        self.__dict__["_resolved"] = {}
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        self.reset_resolved()
+
+    def __delattr__(self, name):
+        super().__delattr__(name)
+        self.reset_resolved()
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.reset_resolved()
+
+    def resolved_generation(self):
+        bridge_config = aws_formatter.bridge_config
+        if bridge_config is None:
+            return None
+        return bridge_config, bridge_config.generation
+
+    def reloading(self, method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.reset_resolved()
+
+        return wrapper
 
     def __getattr__(self, name):
-        return evalute_lazy_recursive(self, super().__getattr__(name))
+        # resolved values of the settings keys are kept per env until the
+        # settings change or the cache of the BridgeConfig is refreshed, tables
+        # and lists are built again on every access so callers can modify them
+        if not name.isupper():
+            value = super().__getattr__(name)
+            if name in RELOAD_METHODS:
+                return self.reloading(value)
+            return evalute_lazy_recursive(self, value)
+
+        wrapped = self._wrapped
+        if wrapped is empty:
+            self._setup()
+            wrapped = self._wrapped
+        if wrapped._fresh or name in wrapped.FRESH_VARS_FOR_DYNACONF:
+            return evalute_lazy_recursive(self, super().__getattr__(name))
+
+        resolved = self._resolved
+        key = (name, wrapped.current_env)
+        generation = self.resolved_generation()
+        entry = resolved.get(key)
+        if entry is not None and entry[0] == generation:
+            return copy_value(entry[1])
+
+        value = evalute_lazy_recursive(self, super().__getattr__(name))
+        if generation is None:
+            # the BridgeConfig is created by the first @aws value
+            generation = self.resolved_generation()
+        resolved[key] = (generation, value)
+        return copy_value(value)
+
+
+def copy_value(value):
+    if isinstance(value, IMMUTABLE_TYPES):
+        return value
+    return copy.deepcopy(value)
 
 
 class AWSFormatter(object):
@@ -75,11 +192,30 @@ class AWSFormatter(object):
         options = value[-1].split(",") if len(value) > 1 else []
         return path, options
 
+    def get_bridge_config(self, settings):
+        if self.bridge_config is None:
+            self.bridge_config = BridgeConfig(
+                settings.APP_NAME, settings.current_env, registry=registry
+            )
+        return self.bridge_config
+
+    def prefetch(self, settings, values):
+        # the keys missing in the cache are fetched and the secrets decrypted
+        # in batches of 10 instead of one request per value
+        paths = {}
+        for value in values:
+            path, options = self.split_options(value)
+            paths[path] = paths.get(path, False) or "decrypt" in options
+
+        bridge_config = self.get_bridge_config(settings)
+        for decrypt in (False, True):
+            keys = [path for path in paths if paths[path] is decrypt]
+            if keys:
+                bridge_config.get_parameters(keys, decrypt=decrypt, default=None)
+
     def __call__(self, value, **context):
         settings = context["this"]
-
-        if self.bridge_config is None:
-            self.bridge_config = BridgeConfig(settings.APP_NAME, settings.current_env)
+        bridge_config = self.get_bridge_config(settings)
 
         path, options = self.split_options(value)
 
@@ -95,7 +231,7 @@ class AWSFormatter(object):
         else:
             cast_type = "string"
 
-        return self.bridge_config.get_parameter(path, type=cast_type, decrypt=decrypt)
+        return bridge_config.get_parameter(path, type=cast_type, decrypt=decrypt)
 
 
 aws_formatter = AWSFormatter()
@@ -106,11 +242,42 @@ converters[f"@{aws_formatter.token}"] = lambda value: LazyFormat(
 )
 
 
-settings = Settings(
-    ENVIRONMENTS_FOR_DYNACONF=True,
-    PRELOAD_FOR_DYNACONF="static_settings.py",
-    DEBUG_LEVEL_FOR_DYNACONF="DEBUG",
-    ENV_SWITCHER_FOR_DYNACONF="ENVIRONMENT",
-    ROOT_PATH_FOR_DYNACONF=guess_settings_path,
-    SETTINGS_FILE_FOR_DYNACONF=["settings.toml"],
-)
+_settings_lock = threading.Lock()
+
+
+def create_settings(**kwargs):
+    options = dict(
+        ENVIRONMENTS_FOR_DYNACONF=True,
+        PRELOAD_FOR_DYNACONF="static_settings.py",
+        DEBUG_LEVEL_FOR_DYNACONF="DEBUG",
+        ENV_SWITCHER_FOR_DYNACONF="ENVIRONMENT",
+        ROOT_PATH_FOR_DYNACONF=guess_settings_path,
+        SETTINGS_FILE_FOR_DYNACONF=["settings.toml"],
+    )
+    options.update(kwargs)
+    return Settings(**options)
+
+
+def get_settings():
+    with _settings_lock:
+        if "settings" not in globals():
+            settings = None
+            # boot from the artifact of `bridgeconfig conf --freeze` if given
+            frozen = os.environ.get("BRIDGECONFIG_FROZEN")
+            if frozen:
+                from .frozen import load_settings
+
+                settings = load_settings(frozen, os.environ.get("ENVIRONMENT"))
+            if settings is None:
+                settings = create_settings(
+                    prefetch_aws=to_bool(os.environ.get("BRIDGECONFIG_PREFETCH"))
+                )
+            globals()["settings"] = settings
+        return globals()["settings"]
+
+
+# settings is created on first access (from bridgeconfig.conf import settings)
+def __getattr__(name):
+    if name == "settings":
+        return get_settings()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
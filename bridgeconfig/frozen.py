@@ -0,0 +1,208 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from .bridgeconfig import BridgeConfig, log, registry
+
+FORMAT = 1
+SECRETS = ("reference", "omit", "include")
+
+
+def parameter_versions(bridge_config, paths):
+    # full path and version each @aws path resolves to
+    found = bridge_config.get_parameters(
+        paths, decrypt=False, default=None, include_path=True
+    )
+    return {
+        path: [fullpath, bridge_config.lookup[fullpath].version if fullpath else None]
+        for path, (fullpath, _) in found.items()
+    }
+
+
+# fully resolved settings of one project/environment. The values that depend on
+# decrypted @aws parameters are kept as references (resolved against ssm on
+# first access), left out or included depending on secrets
+def freeze(settings, secrets="reference"):
+    from dynaconf import default_settings
+
+    from .conf import aws_formatter, find_lazy_values
+
+    if secrets not in SECRETS:
+        raise ValueError("secrets must be one of {}".format(", ".join(SECRETS)))
+
+    internal = set(dir(default_settings))
+    keys = [
+        key
+        for key in settings.keys()
+        if key not in internal and not key.endswith("_FOR_DYNACONF")
+    ]
+    store = settings._wrapped.store
+
+    values = {}
+    references = {}
+    omitted = []
+    paths = set()
+    for key in keys:
+        raw = dict.get(store, key)
+        options = [
+            aws_formatter.split_options(v) for v in find_lazy_values(raw, aws_formatter)
+        ]
+        if secrets != "include" and any("decrypt" in o for _, o in options):
+            if (
+                secrets == "reference"
+                and getattr(raw, "formatter", None) is aws_formatter
+            ):
+                references[key] = raw.value
+                paths.update(path for path, _ in options)
+            else:
+                omitted.append(key)
+            continue
+
+        value = getattr(settings, key)
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            raise ValueError(
+                "{} can't be frozen, {!r} isn't json serializable".format(key, value)
+            )
+        values[key] = value
+        paths.update(path for path, _ in options)
+
+    parameters = {}
+    if paths:
+        parameters = parameter_versions(
+            aws_formatter.get_bridge_config(settings), sorted(paths)
+        )
+
+    return {
+        "format": FORMAT,
+        "project": settings.APP_NAME,
+        "environment": settings.current_env,
+        "frozen_at": time.time(),
+        "values": values,
+        "references": references,
+        "omitted": omitted,
+        "parameters": parameters,
+    }
+
+
+def dump(artifact, path):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as fp:
+            json.dump(artifact, fp, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load(path):
+    with open(path) as fp:
+        artifact = json.load(fp)
+    if artifact.get("format") != FORMAT:
+        raise ValueError(
+            "unsupported frozen settings format {}".format(artifact.get("format"))
+        )
+    return artifact
+
+
+# @aws paths whose full path or version changed since the artifact was frozen
+def check_stale(artifact, bridge_config=None):
+    if bridge_config is None:
+        bridge_config = BridgeConfig(
+            artifact["project"], artifact["environment"], registry=registry
+        )
+        bridge_config.refresh_cache()
+
+    frozen = artifact["parameters"]
+    current = parameter_versions(bridge_config, sorted(frozen))
+    return {
+        path: (frozen[path], current[path])
+        for path in sorted(frozen)
+        if current[path] != frozen[path]
+    }
+
+
+# settings served from a frozen artifact, no toml parsing nor ssm calls unless
+# there are references to resolve (all of them together on first access)
+class FrozenSettings(object):
+    def __init__(self, artifact):
+        self.artifact = artifact
+        self.values = artifact["values"]
+        self.references = artifact["references"]
+        self._lock = threading.Lock()
+        self._resolved = None
+
+    @property
+    def current_env(self):
+        return self.artifact["environment"]
+
+    def resolve(self, name):
+        from .conf import aws_formatter
+
+        with self._lock:
+            bridge_config = aws_formatter.bridge_config
+            generation = bridge_config.generation if bridge_config else None
+            if self._resolved is None or self._resolved[0] != generation:
+                aws_formatter.prefetch(self, list(self.references.values()))
+                self._resolved = (
+                    aws_formatter.bridge_config.generation,
+                    {
+                        key: aws_formatter(value, this=self)
+                        for key, value in self.references.items()
+                    },
+                )
+            return self._resolved[1][name]
+
+    def __getattr__(self, name):
+        if "values" not in self.__dict__:
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __getitem__(self, key):
+        if key in self.values:
+            return self.values[key]
+        if key in self.references:
+            return self.resolve(key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.values or key in self.references
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return list(self.values) + list(self.references)
+
+    def as_dict(self):
+        return {key: self[key] for key in self.keys()}
+
+
+def load_settings(path, environment=None):
+    try:
+        artifact = load(path)
+    except (OSError, ValueError):
+        log.warning("unable to read frozen settings {}".format(path), exc_info=True)
+        return None
+
+    if environment and environment.upper() != artifact["environment"].upper():
+        log.warning(
+            "frozen settings {} are for {} not {}".format(
+                path, artifact["environment"], environment
+            )
+        )
+        return None
+
+    log.debug("loaded frozen settings {}".format(path))
+    return FrozenSettings(artifact)
@@ -0,0 +1,190 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from .throttle import RATE_LIMITED_OPERATIONS, error_code
+
+# metrics reported (tags in brackets):
+#   ssm.calls, ssm.latency (timing)  [operation]  every request sent to ssm
+#   ssm.errors                       [operation, code]
+#   ssm.pages                        [project, environment]  GetParametersByPath
+#   decrypt.batches, decrypt.parameters  [project, environment]
+#   cache.hits, cache.misses, cache.negative_hits  [project, environment]
+#   cache.coalesced                  [project, environment, operation]
+#   refresh.duration (timing), refresh.errors  [project, environment]
+
+
+# interface of the metric sinks, subclasses override the methods they need
+class Sink(object):
+    def incr(self, name, value=1, tags=None):
+        pass
+
+    def timing(self, name, seconds, tags=None):
+        pass
+
+
+# dispatches the metrics to the registered sinks, nothing is done (besides
+# looping over an empty list) until a sink is added
+class Metrics(object):
+    def __init__(self, sinks=None):
+        self.sinks = list(sinks or [])
+
+    def add(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def remove(self, sink):
+        self.sinks.remove(sink)
+
+    def incr(self, name, value=1, tags=None):
+        for sink in self.sinks:
+            sink.incr(name, value, tags)
+
+    def timing(self, name, seconds, tags=None):
+        for sink in self.sinks:
+            sink.timing(name, seconds, tags)
+
+    @contextmanager
+    def timer(self, name, tags=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timing(name, time.perf_counter() - start, tags)
+
+
+metrics = Metrics()
+
+
+def tags_key(tags):
+    return tuple(sorted((tags or {}).items()))
+
+
+# keeps the counters and timings in memory, useful for tests and to dump the
+# usage of a process: counters[("ssm.calls", (("operation", "GetParameter"),))]
+class InMemorySink(Sink):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.timings = defaultdict(list)
+
+    def incr(self, name, value=1, tags=None):
+        with self._lock:
+            self.counters[(name, tags_key(tags))] += value
+
+    def timing(self, name, seconds, tags=None):
+        with self._lock:
+            self.timings[(name, tags_key(tags))].append(seconds)
+
+    def count(self, name, **tags):
+        # sum of the counters of name matching the given tags
+        with self._lock:
+            return sum(
+                value
+                for (counter, key), value in self.counters.items()
+                if counter == name and set(tags.items()) <= set(key)
+            )
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.timings.clear()
+
+
+# statsd style client (incr(stat, count) and timing(stat, milliseconds) like
+# the statsd package), the tag values are appended to the stat name
+class StatsdSink(Sink):
+    def __init__(self, client, prefix="bridgeconfig"):
+        self.client = client
+        self.prefix = prefix
+
+    def stat(self, name, tags):
+        parts = [self.prefix, name] if self.prefix else [name]
+        parts.extend(str(value) for _, value in tags_key(tags))
+        return ".".join(parts)
+
+    def incr(self, name, value=1, tags=None):
+        self.client.incr(self.stat(name, tags), value)
+
+    def timing(self, name, seconds, tags=None):
+        self.client.timing(self.stat(name, tags), seconds * 1000)
+
+
+# counters and histograms of prometheus_client (optional dependency), one
+# metric per name with the tags as labels, "ssm.calls" is exported as
+# bridgeconfig_ssm_calls_total and "ssm.latency" as bridgeconfig_ssm_latency_seconds
+class PrometheusSink(Sink):
+    def __init__(self, registry=None, namespace="bridgeconfig"):
+        import prometheus_client
+
+        self.prometheus = prometheus_client
+        self.registry = registry if registry is not None else prometheus_client.REGISTRY
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def get_metric(self, kind, name, tags):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric_name = name.replace(".", "_")
+                    if kind is self.prometheus.Histogram:
+                        metric_name += "_seconds"
+                    metric = self._metrics[name] = kind(
+                        metric_name,
+                        "bridgeconfig {}".format(name),
+                        sorted(tags or {}),
+                        namespace=self.namespace,
+                        registry=self.registry,
+                    )
+        return metric.labels(**tags) if tags else metric
+
+    def incr(self, name, value=1, tags=None):
+        self.get_metric(self.prometheus.Counter, name, tags).inc(value)
+
+    def timing(self, name, seconds, tags=None):
+        self.get_metric(self.prometheus.Histogram, name, tags).observe(seconds)
+
+
+# wraps an ssm client to report every request (retries included) sent to ssm
+class InstrumentedClient(object):
+    def __init__(self, client, metrics):
+        self.client = client
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if name not in RATE_LIMITED_OPERATIONS or not self.metrics.sinks:
+            return attr
+
+        def call(*args, **kwargs):
+            return self.call(name, attr, *args, **kwargs)
+
+        return call
+
+    def call(self, operation, method, *args, **kwargs):
+        tags = {"operation": operation}
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        except Exception as exc:
+            self.metrics.incr(
+                "ssm.errors",
+                tags={
+                    "operation": operation,
+                    "code": error_code(exc) or type(exc).__name__,
+                },
+            )
+            raise
+        finally:
+            self.metrics.incr("ssm.calls", tags=tags)
+            self.metrics.timing("ssm.latency", time.perf_counter() - start, tags)
+
+
+def instrumented(client, metrics):
+    if isinstance(client, InstrumentedClient):
+        return client
+    return InstrumentedClient(client, metrics)
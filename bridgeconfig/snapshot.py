@@ -0,0 +1,109 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from os.path import expanduser, join
+
+from .bridgeconfig import Parameter
+
+log = logging.getLogger("bridgeconfig")
+
+
+def default_snapshot_directory():
+    return os.environ.get(
+        "BRIDGECONFIG_SNAPSHOT_DIR", join(expanduser("~"), ".cache", "bridgeconfig")
+    )
+
+
+# one compact json file per project/environment with the raw parameters and
+# the time they were fetched. Decrypted SecureStrings are written with their
+# encrypted value unless include_secrets is set, BridgeConfig decrypts them
+# again with SSM when they are read.
+class Snapshot(object):
+    def __init__(self, directory=None, ttl=300, include_secrets=False):
+        self.directory = directory or default_snapshot_directory()
+        self.ttl = ttl
+        self.include_secrets = include_secrets
+
+    def get_path(self, project, environment):
+        return join(self.directory, "{}.{}.json".format(project, environment))
+
+    def is_fresh(self, fetched_at):
+        return self.ttl is None or time.time() - fetched_at < self.ttl
+
+    def load(self, project, environment):
+        path = self.get_path(project, environment)
+        try:
+            with open(path) as fp:
+                data = json.load(fp)
+            fetched_at = data["fetched_at"]
+            parameters = [
+                Parameter(name, value, type, version, bool(decrypted))
+                for name, value, type, version, decrypted in data["parameters"]
+            ]
+        except FileNotFoundError:
+            log.debug("snapshot {} not found".format(path))
+            return None
+        except (OSError, ValueError, KeyError, TypeError):
+            log.warning("unable to read snapshot {}".format(path), exc_info=True)
+            return None
+
+        if not self.is_fresh(fetched_at):
+            log.debug("snapshot {} is stale".format(path))
+            return None
+
+        log.debug("loaded snapshot {}".format(path))
+        return fetched_at, parameters
+
+    def dump_parameter(self, param):
+        decrypted = bool(param.get("Decrypted"))
+        if decrypted and param["Type"] == "SecureString" and not self.include_secrets:
+            # kept encrypted so it is decrypted again on demand, the ones
+            # fetched already decrypted are fetched again
+            ciphertext = getattr(param, "ciphertext", None)
+            if ciphertext is None:
+                return None
+            return [param["Name"], ciphertext, param["Type"], param.get("Version"), 0]
+        return [
+            param["Name"],
+            param["Value"],
+            param["Type"],
+            param.get("Version"),
+            1 if decrypted else 0,
+        ]
+
+    def dumps(self, parameters, fetched_at):
+        return json.dumps(
+            {
+                "fetched_at": fetched_at,
+                "parameters": [
+                    record
+                    for record in map(self.dump_parameter, parameters)
+                    if record is not None
+                ],
+            },
+            separators=(",", ":"),
+        )
+
+    def save(self, project, environment, parameters, fetched_at=None):
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        path = self.get_path(project, environment)
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            # write to a temporary file on the same directory and rename it so
+            # readers never see a partially written snapshot
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as fp:
+                    fp.write(self.dumps(parameters, fetched_at))
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            log.warning("unable to write snapshot {}".format(path), exc_info=True)
+            return False
+
+        log.debug("saved snapshot {}".format(path))
+        return True
@@ -0,0 +1,130 @@
+import logging
+import random
+import threading
+import time
+
+log = logging.getLogger("bridgeconfig")
+
+THROTTLING_CODES = (
+    "ThrottlingException",
+    "Throttling",
+    "TooManyUpdates",
+    "RequestLimitExceeded",
+)
+
+RATE_LIMITED_OPERATIONS = (
+    "get_parameters_by_path",
+    "get_parameters",
+    "get_parameter",
+    "get_parameter_history",
+    "put_parameter",
+    "delete_parameter",
+)
+
+
+class ThrottlingError(Exception):
+    def __init__(self, operation, attempts, error):
+        self.operation = operation
+        self.attempts = attempts
+        self.error = error
+        super().__init__(
+            "{} throttled by ssm after {} attempts".format(operation, attempts)
+        )
+
+
+def error_code(exc):
+    response = getattr(exc, "response", None)
+    if not isinstance(response, dict):
+        return None
+    return response.get("Error", {}).get("Code")
+
+
+def is_throttling(exc):
+    return error_code(exc) in THROTTLING_CODES
+
+
+# token bucket shared by all the clients of the process, the rate is halved
+# every time ssm throttles a request and slowly recovers with every success
+class TokenBucket(object):
+    def __init__(self, rate=40, capacity=None, min_rate=1, recovery=0.5):
+        self.max_rate = self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.min_rate = float(min_rate)
+        self.recovery = recovery
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            # take the token now and wait outside the lock until it is due
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def throttled(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+        log.debug("ssm throttling, rate limited to {:.1f}/s".format(self.rate))
+
+    def succeeded(self):
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.recovery)
+
+
+rate_limiter = TokenBucket(rate=40, capacity=100)
+
+
+# wraps an ssm client so every call takes a token from the rate limiter and
+# throttled calls are retried with exponential backoff and full jitter
+class RateLimitedClient(object):
+    def __init__(
+        self, client, limiter=None, max_attempts=8, base_delay=0.1, max_delay=5
+    ):
+        self.client = client
+        self.limiter = limiter if limiter is not None else rate_limiter
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if name not in RATE_LIMITED_OPERATIONS:
+            return attr
+
+        def call(*args, **kwargs):
+            return self.call(name, attr, *args, **kwargs)
+
+        return call
+
+    def call(self, operation, method, *args, **kwargs):
+        for attempt in range(1, self.max_attempts + 1):
+            self.limiter.acquire()
+            try:
+                response = method(*args, **kwargs)
+            except Exception as exc:
+                if not is_throttling(exc):
+                    raise
+                self.limiter.throttled()
+                if attempt == self.max_attempts:
+                    raise ThrottlingError(operation, attempt, exc) from exc
+                delay = random.uniform(
+                    0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+                )
+                log.debug(
+                    "{} throttled (attempt {}), retrying in {:.2f}s".format(
+                        operation, attempt, delay
+                    )
+                )
+                time.sleep(delay)
+            else:
+                self.limiter.succeeded()
+                return response
@@ -31,7 +31,7 @@ setup(
     },
     entry_points={
         "console_scripts": [
-            "bridgeconfig = bridgeconfig:cli",
+            "bridgeconfig = bridgeconfig.cli:cli",
         ],
     },
     zip_safe=False,
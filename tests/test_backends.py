@@ -0,0 +1,203 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from botocore.exceptions import ClientError
+
+from bridgeconfig.backends import Backend, LocalSSM
+from bridgeconfig.bridgeconfig import BridgeConfig, ParameterNotFound
+
+
+class TestLocalSSM(unittest.TestCase):
+    def setUp(self):
+        self.ssm = LocalSSM(
+            {"/PJT/ENV/K{:02}".format(i): "V{}".format(i) for i in range(25)}
+        )
+        self.ssm.put_parameter(Name="/PJT/ENV/SECRET", Value="S", Type="SecureString")
+        self.ssm.put_parameter(Name="/PJT/ENV/SUB/K", Value="SUB")
+        self.ssm.put_parameter(Name="/All/All/K00", Value="ALL")
+        self.ssm.calls.clear()
+
+    def test_backend(self):
+        self.assertIsInstance(self.ssm, Backend)
+
+        class Partial(Backend):
+            def get_parameter(self, Name, WithDecryption=False):
+                return {}
+
+        with self.assertRaises(TypeError):
+            Partial()
+
+    def test_get_parameters_by_path(self):
+        response = self.ssm.get_parameters_by_path(Path="/PJT/ENV/")
+        self.assertEqual(len(response["Parameters"]), 10)
+        self.assertEqual(response["NextToken"], "10")
+
+        names = []
+        token = None
+        while True:
+            kwargs = {"NextToken": token} if token else {}
+            response = self.ssm.get_parameters_by_path(
+                Path="/PJT/ENV/", Recursive=True, **kwargs
+            )
+            names += [p["Name"] for p in response["Parameters"]]
+            token = response.get("NextToken")
+            if token is None:
+                break
+        self.assertEqual(len(names), 27)
+        self.assertIn("/PJT/ENV/SUB/K", names)
+        self.assertEqual(self.ssm.calls["GetParametersByPath"], 4)
+
+    def test_get_parameters(self):
+        response = self.ssm.get_parameters(Names=["/PJT/ENV/SECRET", "/PJT/ENV/NO"])
+        self.assertNotEqual(response["Parameters"][0]["Value"], "S")
+        self.assertEqual(response["InvalidParameters"], ["/PJT/ENV/NO"])
+
+        response = self.ssm.get_parameters(
+            Names=["/PJT/ENV/SECRET"], WithDecryption=True
+        )
+        self.assertEqual(response["Parameters"][0]["Value"], "S")
+
+        with self.assertRaises(ClientError):
+            self.ssm.get_parameters(
+                Names=["/PJT/ENV/K{:02}".format(i) for i in range(11)]
+            )
+
+    def test_put_delete_history(self):
+        with self.assertRaises(self.ssm.exceptions.ParameterAlreadyExists):
+            self.ssm.put_parameter(Name="/PJT/ENV/K00", Value="X")
+        self.assertEqual(
+            self.ssm.put_parameter(Name="/PJT/ENV/K00", Value="X", Overwrite=True)[
+                "Version"
+            ],
+            2,
+        )
+        history = self.ssm.get_parameter_history(Name="/PJT/ENV/K00")["Parameters"]
+        self.assertEqual([h["Value"] for h in history], ["V0", "X"])
+
+        self.ssm.delete_parameter(Name="/PJT/ENV/K00")
+        with self.assertRaises(self.ssm.exceptions.ParameterNotFound):
+            self.ssm.get_parameter(Name="/PJT/ENV/K00")
+        with self.assertRaises(self.ssm.exceptions.ParameterNotFound):
+            self.ssm.delete_parameter(Name="/PJT/ENV/K00")
+
+    def test_throttling(self):
+        ssm = LocalSSM({"/PJT/ENV/K": "V"}, throttle_rate=1)
+        with self.assertRaises(ClientError) as error:
+            ssm.get_parameter(Name="/PJT/ENV/K")
+        self.assertEqual(
+            error.exception.response["Error"]["Code"], "ThrottlingException"
+        )
+
+    def test_file_backed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "ssm.json")
+            LocalSSM({"/PJT/ENV/K": ("V", "SecureString")}, path=path)
+            ssm = LocalSSM(path=path)
+            param = ssm.get_parameter(Name="/PJT/ENV/K", WithDecryption=True)
+            self.assertEqual(param["Parameter"]["Value"], "V")
+            self.assertEqual(param["Parameter"]["Type"], "SecureString")
+
+    def test_bridgeconfig(self):
+        bc = BridgeConfig("PJT", "ENV", client=self.ssm)
+        self.assertEqual(bc.get_parameter("K00"), "V0")
+        self.assertEqual(bc.get_parameter("All/All/K00"), "ALL")
+        self.assertEqual(bc.get_parameter("SECRET"), "S")
+        self.assertEqual(bc.get_parameter("SUB/K"), "SUB")
+        # /All/All/K00 is shadowed by /PJT/ENV/K00
+        self.assertEqual(len(bc.get_all_parameters()), 27)
+        with self.assertRaises(ParameterNotFound):
+            bc.get_parameter("NOPE")
+
+        bc.set_parameter("K00", "NEW")
+        self.assertEqual(
+            [h["Value"] for h in bc.get_parameter_history("K00")], ["V0", "NEW"]
+        )
+        bc.delete_paramter("K00")
+        bc.refresh_cache()
+        self.assertEqual(bc.get_parameter("K00"), "ALL")
+
+    def test_iter_parameters(self):
+        bc = BridgeConfig("PJT", "ENV", client=self.ssm, rate_limiter=None)
+        parameters = bc.iter_parameters(decrypt=True)
+        self.assertEqual(next(parameters).name, "/All/All/K00")
+        self.assertEqual(self.ssm.calls["GetParametersByPath"], 1)
+
+        names = {param.name: param for param in parameters}
+        self.assertEqual(len(names), 27)
+        self.assertIn("/PJT/ENV/SUB/K", names)
+        self.assertEqual(names["/PJT/ENV/SECRET"].value, "S")
+        self.assertTrue(names["/PJT/ENV/SECRET"].decrypted)
+        self.assertEqual(self.ssm.calls["GetParametersByPath"], 6)
+        self.assertEqual(self.ssm.calls["GetParameters"], 0)
+        self.assertIsNone(bc._state)
+
+        secret = {p.name: p for p in bc.iter_parameters(paths=["/PJT/"])}[
+            "/PJT/ENV/SECRET"
+        ]
+        self.assertNotEqual(secret.value, "S")
+        self.assertFalse(secret.decrypted)
+
+    def test_set_parameters(self):
+        bc = BridgeConfig("PJT", "ENV", client=self.ssm, rate_limiter=None)
+        plan = bc.set_parameters(
+            {
+                "K00": "V0",
+                "K01": ("V1", "SecureString"),
+                "SECRET": ("S", "SecureString"),
+                "All/NEW": "N",
+            }
+        )
+        self.assertEqual(
+            plan,
+            {
+                "/PJT/ENV/K01": ("V1", "SecureString", "update"),
+                "/PJT/All/NEW": ("N", "String", "create"),
+            },
+        )
+        self.assertEqual(self.ssm.calls["PutParameter"], 2)
+        self.assertEqual(self.ssm.calls["GetParameters"], 1)
+        self.assertEqual(bc.get_parameter("NEW"), "N")
+        self.assertEqual(bc.set_parameters({"K01": ("V1", "SecureString")}), {})
+
+    def test_single_flight(self):
+        self.ssm.latency = 0.05
+        bc = BridgeConfig("PJT", "ENV", client=self.ssm, rate_limiter=None)
+        start = threading.Barrier(8)
+        results = []
+
+        def read(key, **kwargs):
+            start.wait()
+            results.append(bc.get_parameter(key, **kwargs))
+
+        def run(target, *args, **kwargs):
+            threads = [
+                threading.Thread(target=target, args=args, kwargs=kwargs)
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        # the first readers share the load and the decryption of the secret
+        run(read, "SECRET")
+        self.assertEqual(results, ["S"] * 8)
+        self.assertEqual(self.ssm.calls["GetParametersByPath"], 6)
+        self.assertEqual(self.ssm.calls["GetParameters"], 1)
+
+        # one GetParameter per candidate of the search path
+        run(read, "NOPE", default=None)
+        self.assertEqual(self.ssm.calls["GetParameter"], 4)
+
+        state = bc._state
+
+        def refresh():
+            start.wait()
+            bc.refresh_cache()
+
+        run(refresh)
+        self.assertEqual(self.ssm.calls["GetParametersByPath"], 12)
+        self.assertIsNot(bc._state, state)
+        self.assertEqual(bc.generation, state.generation + 1)
@@ -1,8 +1,14 @@
+import asyncio
 import os
+import tempfile
+import threading
+import time
 import unittest
 from unittest.mock import MagicMock, patch
 
 from bridgeconfig import bridgeconfig
+from bridgeconfig.aio import AsyncBridgeConfig
+from bridgeconfig.snapshot import Snapshot
 
 os.environ["ENVIRONMENT"] = "ENV"
 os.environ["SETTINGS_PATH"] = os.path.dirname(os.path.abspath(__file__))
@@ -69,6 +75,88 @@ class TestBridgeConfig(unittest.TestCase):
         bc = bridgeconfig.BridgeConfig(project="All", environment="All")
         self.assertListEqual(bc.search_path, ["/All/All/"])
 
+    def test_get_raw_parameters(self):
+        def get_parameters_by_path(Path, NextToken=None, **kwargs):
+            page = int(NextToken or 0)
+            response = {
+                "Parameters": [
+                    {"Name": "{}K{}".format(Path, page), "Value": "V", "Type": "String"}
+                ]
+            }
+            if page < 2:
+                response["NextToken"] = str(page + 1)
+            return response
+
+        self.ssm_client.get_parameters_by_path.side_effect = get_parameters_by_path
+
+        expected = [
+            "{}K{}".format(path, page)
+            for path in ("/All/All/", "/All/ENV/", "/PJT/All/", "/PJT/ENV/")
+            for page in range(3)
+        ]
+        for max_workers in (1, 4):
+            bc = bridgeconfig.BridgeConfig(
+                project="PJT", environment="ENV", max_workers=max_workers
+            )
+            self.assertListEqual([p["Name"] for p in bc.get_raw_parameters()], expected)
+
+    def test_registry(self):
+        self.ssm_client.get_parameters_by_path.side_effect = lambda Path, **kwargs: {
+            "Parameters": [{"Name": Path + "K", "Value": Path, "Type": "String"}]
+        }
+        registry = bridgeconfig.Registry()
+        bc1 = bridgeconfig.BridgeConfig("PJT", "ENV", registry=registry)
+        bc2 = bridgeconfig.BridgeConfig("OTHER", "ENV", registry=registry)
+        bc3 = bridgeconfig.BridgeConfig("OTHER", "ENV", region_name="eu-west-1")
+        # clients are created on first use
+        self.assertEqual(self.boto3_client.call_count, 0)
+        self.assertIs(bc1.client, bc2.client)
+        self.assertIsNot(bc1.client, bc3.client)
+        self.assertEqual(self.boto3_client.call_count, 2)  # bc1 + bc3
+
+        self.assertEqual(bc1.get_parameter("K"), "/PJT/ENV/")
+        self.assertEqual(bc2.get_parameter("K"), "/OTHER/ENV/")
+        fetched = [
+            c.kwargs["Path"]
+            for c in self.ssm_client.get_parameters_by_path.call_args_list
+        ]
+        self.assertEqual(
+            sorted(fetched),
+            [
+                "/All/All/",
+                "/All/ENV/",
+                "/OTHER/All/",
+                "/OTHER/ENV/",
+                "/PJT/All/",
+                "/PJT/ENV/",
+            ],
+        )
+        self.assertIs(bc1.lookup["/All/All/K"], bc2.lookup["/All/All/K"])
+
+        # explicit refreshes go to ssm and update the shared prefixes
+        bc2.refresh_cache()
+        self.assertEqual(self.ssm_client.get_parameters_by_path.call_count, 10)
+        self.assertIs(bc3.registry, None)
+
+        # reused prefixes keep the time they were fetched, so max_age applies
+        fetched_at = time.time() - 120
+        for key, (_, parameters) in registry._prefixes.items():
+            registry._prefixes[key] = (fetched_at, parameters)
+        bc4 = bridgeconfig.BridgeConfig("PJT", "ENV", registry=registry, max_age=60)
+        bc4.refresh_cache_in_background = MagicMock()
+        self.assertEqual(bc4.get_parameter("K"), "/PJT/ENV/")
+        self.assertEqual(self.ssm_client.get_parameters_by_path.call_count, 10)
+        self.assertTrue(bc4.is_cache_expired)
+        self.assertEqual(bc4.get_parameter("K"), "/PJT/ENV/")
+        bc4.refresh_cache_in_background.assert_called_once_with()
+
+        # and are fetched again once older than the registry ttl
+        registry.ttl = 60
+        bc5 = bridgeconfig.BridgeConfig("PJT", "ENV", registry=registry, max_age=60)
+        self.assertEqual(bc5.get_parameter("K"), "/PJT/ENV/")
+        self.assertEqual(self.ssm_client.get_parameters_by_path.call_count, 14)
+        self.assertFalse(bc5.is_cache_expired)
+
     def test_get_param_name(self):
         self.assertEquals(self.bc.get_param_name("/PJT/ENV/KEY"), "KEY")
         self.assertEquals(self.bc.get_param_name("PJT/ENV/KEY"), "KEY")
@@ -114,6 +202,295 @@ class TestBridgeConfig(unittest.TestCase):
 
         self.assertEquals(self.bc.still_encrypted, {"K1": "/PJT/ENV/K1"})
 
+    def test_snapshot(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.bc.snapshot = Snapshot(directory, ttl=60)
+            self.bc.refresh_cache()
+
+            bc = bridgeconfig.BridgeConfig(
+                project="PJT", environment="ENV", snapshot=Snapshot(directory, ttl=60)
+            )
+            bc.get_raw_parameters = MagicMock()
+            self.assertEqual(
+                bc.names,
+                {"K1": "/PJT/ENV/K1", "K2": "/PJT/All/K2", "K3": "/All/All/K3"},
+            )
+            bc.get_raw_parameters.assert_not_called()
+
+            # stale snapshots are refreshed from ssm
+            bc = bridgeconfig.BridgeConfig(
+                project="PJT", environment="ENV", snapshot=Snapshot(directory, ttl=0)
+            )
+            bc.get_raw_parameters = MagicMock(return_value=[])
+            self.assertEqual(bc.names, {})
+            bc.get_raw_parameters.assert_called_once_with(reuse=True)
+
+    def test_snapshot_secrets(self):
+        self.bc.get_raw_parameters.return_value[0]["Version"] = 1
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot = Snapshot(directory)
+            self.bc.snapshot = snapshot
+            self.bc.get_all_parameters(decrypt=True)
+            self.bc.refresh_cache(incremental=True)
+            self.assertTrue(self.bc.lookup["/PJT/ENV/K1"].decrypted)
+            with open(snapshot.get_path("PJT", "ENV")) as fp:
+                self.assertNotIn("V1", fp.read())
+            _, loaded = snapshot.load("PJT", "ENV")
+            self.assertEqual(
+                [p["Name"] for p in loaded],
+                ["/PJT/ENV/K1", "/PJT/All/K2", "/All/All/K3"],
+            )
+            self.assertEqual(loaded[0]["Value"], "Still-Encrypted-Value")
+            self.assertFalse(loaded[0]["Decrypted"])
+
+            # the secret is decrypted again when read, the encrypted value is
+            # still returned without decrypt
+            self.ssm_client.get_parameters.reset_mock()
+            bc = bridgeconfig.BridgeConfig(
+                project="PJT", environment="ENV", snapshot=snapshot
+            )
+            self.assertEqual(bc.names["K1"], "/PJT/ENV/K1")
+            self.assertTrue(bc.is_encrypted("K1"))
+            self.assertEqual(
+                bc.get_parameter("K1", decrypt=False), "Still-Encrypted-Value"
+            )
+            self.assertEqual(bc.get_parameter("K1"), "V1")
+            self.ssm_client.get_parameters.assert_called_once_with(
+                Names=["/PJT/ENV/K1"], WithDecryption=True
+            )
+
+            # parameters fetched already decrypted have no encrypted value
+            fetched = bridgeconfig.Parameter(
+                "/OTHER/Prod/Key", "Value", "SecureString", decrypted=True
+            )
+            snapshot.save("PJT", "ENV", bc.cache + [fetched])
+            _, loaded = snapshot.load("PJT", "ENV")
+            self.assertNotIn("/OTHER/Prod/Key", [p["Name"] for p in loaded])
+
+            snapshot = Snapshot(directory, include_secrets=True)
+            snapshot.save("PJT", "ENV", bc.cache)
+            _, loaded = snapshot.load("PJT", "ENV")
+            self.assertEqual(loaded[0]["Value"], "V1")
+            self.assertTrue(loaded[0]["Decrypted"])
+
+    def test_max_age(self):
+        self.bc.max_age = 60
+        self.assertIn("K1", self.bc.names)
+        self.assertIsNone(self.bc._refresh_thread)
+
+        refreshing = threading.Event()
+
+        def get_raw_parameters(**kwargs):
+            refreshing.wait()
+            return [{"Name": "/PJT/ENV/K4", "Value": "V4", "Type": "String"}]
+
+        self.bc.get_raw_parameters.side_effect = get_raw_parameters
+        self.bc._next_refresh = 0
+        # the stale values are served while the refresh runs in background
+        self.assertIn("K1", self.bc.names)
+        self.assertIn("K1", self.bc.names)
+        refreshing.set()
+        self.bc._refresh_thread.join()
+        self.assertEqual(self.bc.names, {"K4": "/PJT/ENV/K4"})
+        self.assertEqual(self.bc.get_raw_parameters.call_count, 2)
+        self.assertFalse(self.bc.is_cache_expired)
+
+    def test_max_age_refresh_error(self):
+        errors = []
+        self.bc.max_age = 60
+        self.bc.on_refresh_error = errors.append
+        self.bc.refresh_cache()
+
+        self.bc.get_raw_parameters.side_effect = ValueError("boom")
+        self.bc._next_refresh = 0
+        self.assertIn("K1", self.bc.names)
+        self.bc._refresh_thread.join()
+        self.assertIsInstance(errors[0], ValueError)
+        self.assertIn("K1", self.bc.names)
+        self.assertFalse(self.bc.is_cache_expired)
+
+    def test_incremental_refresh(self):
+        self.bc.get_raw_parameters.return_value = [
+            {
+                "Name": "/PJT/ENV/K1",
+                "Value": "ENC",
+                "Type": "SecureString",
+                "Version": 1,
+            },
+            {
+                "Name": "/PJT/ENV/FALSE1",
+                "Value": "ENC",
+                "Type": "SecureString",
+                "Version": 1,
+            },
+            {"Name": "/PJT/All/K2", "Value": "V2", "Type": "String", "Version": 1},
+        ]
+        self.bc.decrypt_parameters()
+        self.assertEqual(self.ssm_client.get_parameters.call_count, 1)
+
+        self.bc.get_raw_parameters.return_value = [
+            {
+                "Name": "/PJT/ENV/K1",
+                "Value": "ENC",
+                "Type": "SecureString",
+                "Version": 1,
+            },
+            {
+                "Name": "/PJT/ENV/FALSE1",
+                "Value": "ENC",
+                "Type": "SecureString",
+                "Version": 2,
+            },
+        ]
+        self.bc.refresh_cache(incremental=True)
+
+        self.ssm_client.get_parameters.assert_called_with(
+            Names=["/PJT/ENV/FALSE1"], WithDecryption=True
+        )
+        self.assertEqual(self.ssm_client.get_parameters.call_count, 2)
+        self.assertEqual(
+            self.bc.names, {"K1": "/PJT/ENV/K1", "FALSE1": "/PJT/ENV/FALSE1"}
+        )
+        self.assertEqual(self.bc.still_encrypted, {})
+        self.assertEqual(self.bc.get_parameter("K1"), "V1")
+        self.assertEqual(self.bc.get_parameter("FALSE1"), "false")
+
+    def test_index(self):
+        self.bc.get_raw_parameters.return_value = [
+            {"Name": "/PJT/ENV/K", "Value": "PJT-ENV", "Type": "String"},
+            {"Name": "/All/All/K", "Value": "All-All", "Type": "String"},
+            {"Name": "/PJT/All/K", "Value": "PJT-All", "Type": "String"},
+            {"Name": "/All/ENV/K", "Value": "All-ENV", "Type": "String"},
+            {"Name": "/All/All/ONLY", "Value": "All-All", "Type": "String"},
+            {"Name": "/All/All/SUB/K", "Value": "All-All-SUB", "Type": "String"},
+        ]
+        self.assertEqual(
+            self.bc.names,
+            {"K": "/PJT/ENV/K", "ONLY": "/All/All/ONLY", "SUB/K": "/All/All/SUB/K"},
+        )
+        for path, value in (
+            ("K", "PJT-ENV"),
+            ("ENV/K", "PJT-ENV"),
+            ("/ENV/K", "PJT-ENV"),
+            ("All/K", "PJT-All"),
+            ("All/ONLY", "All-All"),
+            ("All/All/K", "All-All"),
+            ("/All/ENV/K", "All-ENV"),
+            ("SUB/K", "All-All-SUB"),
+        ):
+            self.assertEqual(self.bc.get_parameter(path, decrypt=False), value)
+        self.ssm_client.get_parameter.assert_not_called()
+
+        self.assertEqual(self.bc.get_parameter("/OTHER/Prod/Key"), "Value")
+        self.assertEqual(self.bc.get_parameter("OTHER/Prod/Key"), "Value")
+        self.assertEqual(self.bc.index["OTHER/Prod/Key"], "/OTHER/Prod/Key")
+        self.assertEqual(self.ssm_client.get_parameter.call_count, 1)
+
+    def test_state(self):
+        state = self.bc.state
+        self.assertEqual(state.generation, 1)
+        self.assertEqual(self.bc.get_parameter("K1"), "V1")
+        self.assertEqual(self.bc.get_parameter("/OTHER/Prod/Key"), "Value")
+
+        # decrypted and fetched parameters go to a copy, the published state
+        # is never modified
+        self.assertIsNot(self.bc.state, state)
+        self.assertEqual(self.bc.generation, 1)
+        self.assertEqual(state.lookup["/PJT/ENV/K1"].value, "Still-Encrypted-Value")
+        self.assertFalse(state.lookup["/PJT/ENV/K1"].decrypted)
+        self.assertNotIn("/OTHER/Prod/Key", state.lookup)
+        self.assertIn("/OTHER/Prod/Key", self.bc.lookup)
+        self.assertEqual(len(self.bc.cache), 4)
+
+        self.bc.refresh_cache()
+        self.assertEqual(self.bc.generation, 2)
+        self.assertNotIn("/OTHER/Prod/Key", self.bc.lookup)
+
+    def test_state_replaced_while_reading(self):
+        raw_parameters = self.bc.get_raw_parameters.return_value
+        self.assertIn("K1", self.bc.names)
+
+        def refreshing(method):
+            # publishes a state without any parameter right after method
+            def wrapper(*args):
+                result = method(*args)
+                self.bc.get_raw_parameters.return_value = []
+                self.bc.refresh_cache()
+                return result
+
+            return wrapper
+
+        add_parameters = self.bc.add_parameters
+        self.bc.add_parameters = refreshing(add_parameters)
+        self.assertEqual(self.bc.get_parameter("/OTHER/Prod/Key"), "Value")
+        self.assertEqual(
+            self.bc.get_parameters(["/OTHER/Prod/Key"]), {"/OTHER/Prod/Key": "Value"}
+        )
+        self.bc.add_parameters = add_parameters
+
+        self.bc.get_raw_parameters.return_value = raw_parameters
+        self.bc.refresh_cache()
+        self.bc.set_decrypted = refreshing(self.bc.set_decrypted)
+        # the record found before the refresh is used
+        self.assertEqual(
+            self.bc.get_parameter("K1", include_path=True)[0], "/PJT/ENV/K1"
+        )
+        self.assertNotIn("K1", self.bc.names)
+
+    def test_parameter_records(self):
+        param = self.bc.lookup["/PJT/ENV/K1"]
+        self.assertIsInstance(param, bridgeconfig.Parameter)
+        self.assertFalse(hasattr(param, "__dict__"))
+        self.assertEqual(param["Name"], "/PJT/ENV/K1")
+        self.assertEqual(param["Type"], "SecureString")
+        self.assertIsNone(param.get("Version"))
+        self.assertIsNone(param.get("ARN"))
+        self.assertNotIn("LastModifiedDate", param)
+        with self.assertRaises(KeyError):
+            param["ARN"]
+
+        param = bridgeconfig.Parameter.from_response(
+            {
+                "Name": "/PJT/ENV/" + "K1",
+                "Value": "V",
+                "Type": "String",
+                "Version": 3,
+                "ARN": "arn:aws:ssm:us-east-1:000000000000:parameter/PJT/ENV/K1",
+                "DataType": "text",
+            }
+        )
+        self.assertIs(param.name, self.bc.lookup["/PJT/ENV/K1"].name)
+        self.assertEqual(param.version, 3)
+        param["Value"] = "V2"
+        self.assertEqual(param.value, "V2")
+
+    def test_subtree(self):
+        self.bc.get_raw_parameters.return_value = [
+            {"Name": "/All/All/db/host", "Value": "all-host", "Type": "String"},
+            {"Name": "/All/All/db/port", "Value": "5432", "Type": "String"},
+            {"Name": "/PJT/ENV/db/host", "Value": "pjt-host", "Type": "String"},
+            {"Name": "/PJT/ENV/db/replica/host", "Value": "r-host", "Type": "String"},
+            {"Name": "/PJT/ENV/K1", "Value": "ENC", "Type": "SecureString"},
+            {"Name": "/PJT/ENV/dbx", "Value": "x", "Type": "String"},
+        ]
+        self.assertEqual(
+            self.bc.get_subtree("db/"),
+            {"host": "pjt-host", "port": "5432", "replica": {"host": "r-host"}},
+        )
+        self.assertEqual(
+            self.bc.get_subtree("db/replica", decrypt=False), {"host": "r-host"}
+        )
+        self.assertEqual(self.bc.get_subtree("nope/"), {})
+        self.assertEqual(
+            self.bc.list_keys("db/"), ["db/host", "db/port", "db/replica/host"]
+        )
+        self.assertEqual(self.bc.list_keys("db/host"), ["db/host"])
+        self.assertEqual(self.bc.list_keys("nope"), [])
+        self.assertEqual(len(self.bc.list_keys()), 5)
+        self.ssm_client.get_parameters.assert_not_called()
+
+        self.assertEqual(self.bc.get_subtree("/")["K1"], "V1")
+
     def test_decrypt_parameters(self):
         self.bc.decrypt_parameters()
         self.ssm_client.get_parameters.assert_called_with(
@@ -122,6 +499,32 @@ class TestBridgeConfig(unittest.TestCase):
 
         self.assertTrue(self.bc.lookup["/PJT/ENV/K1"].get("Decrypted"))
 
+    def test_decrypt_parameters_chunks(self):
+        self.parameters.update({"/PJT/ENV/S{}".format(i): str(i) for i in range(25)})
+        self.bc.get_raw_parameters.return_value = [
+            {"Name": name, "Value": "ENC", "Type": "SecureString"}
+            for name in sorted(self.parameters)
+        ] + [{"Name": "/PJT/ENV/GONE", "Value": "ENC", "Type": "SecureString"}]
+
+        def get_parameters(Names, WithDecryption=False):
+            return {
+                "Parameters": [
+                    {"Name": name, "Value": self.parameters[name]}
+                    for name in Names
+                    if name in self.parameters
+                ],
+                "InvalidParameters": [n for n in Names if n not in self.parameters],
+            }
+
+        self.ssm_client.get_parameters.side_effect = get_parameters
+
+        self.assertEqual(self.bc.decrypt_parameters(), ["/PJT/ENV/GONE"])
+        self.assertEqual(self.ssm_client.get_parameters.call_count, 4)
+        for call in self.ssm_client.get_parameters.call_args_list:
+            self.assertLessEqual(len(call.kwargs["Names"]), 10)
+        self.assertEqual(self.bc.still_encrypted, {"GONE": "/PJT/ENV/GONE"})
+        self.assertEqual(self.bc.get_parameter("S24", decrypt=False), "24")
+
     def test_get_all_parameters(self):
         parameters = self.bc.get_all_parameters(decrypt=True)
         self.assertListEqual(
@@ -156,6 +559,111 @@ class TestBridgeConfig(unittest.TestCase):
         self.assertFalse(self.bc.get_parameter("FALSE1", decrypt=True, type="bool"))
         self.assertFalse(self.bc.get_parameter("FALSE2", decrypt=True, type="bool"))
 
+    def test_get_parameter_converted_cache(self):
+        converter = MagicMock(side_effect=lambda value: {"value": value})
+        int_converter = MagicMock(side_effect=int)
+        self.bc.get_raw_parameters.return_value = [
+            {"Name": "/PJT/ENV/J", "Value": "1", "Type": "String", "Version": 1}
+        ]
+        conversions = patch.dict(
+            bridgeconfig.DEFAULT_CONVERSIONS, {"int": int_converter, "json": converter}
+        )
+        conversions.start()
+        self.addCleanup(conversions.stop)
+
+        self.assertEqual(self.bc.get_parameter("J", type="int"), 1)
+        self.assertEqual(self.bc.get_parameter("J", type="int"), 1)
+        self.assertEqual(int_converter.call_count, 1)
+
+        # mutable values are converted on every call unless shared
+        first = self.bc.get_parameter("J", type="json")
+        self.assertIsNot(first, self.bc.get_parameter("J", type="json"))
+        self.assertEqual(converter.call_count, 2)
+        shared = self.bc.get_parameter("J", type="json", shared=True)
+        self.assertIs(shared, self.bc.get_parameter("J", type="json", shared=True))
+        self.assertIsNot(shared, self.bc.get_parameter("J", type="json"))
+        self.assertEqual(converter.call_count, 4)
+
+        # callables given as type are called every time and never kept
+        entries = len(self.bc.state.converted)
+        for _ in range(10):
+            self.assertEqual(self.bc.get_parameter("J", type=lambda v: v + "!"), "1!")
+        self.assertEqual(self.bc.get_parameter("J", type=int_converter), 1)
+        self.assertEqual(int_converter.call_count, 2)
+        self.assertEqual(len(self.bc.state.converted), entries)
+
+        self.bc.get_raw_parameters.return_value = [
+            {"Name": "/PJT/ENV/J", "Value": "2", "Type": "String", "Version": 2}
+        ]
+        self.bc.refresh_cache()
+        self.assertEqual(self.bc.get_parameter("J", type="int"), 2)
+        self.assertEqual(int_converter.call_count, 3)
+
+    def test_get_parameters(self):
+        def get_parameters(Names, WithDecryption=False):
+            return {
+                "Parameters": [
+                    {"Name": n, "Value": self.parameters[n], "Type": "String"}
+                    for n in Names
+                    if n in self.parameters
+                ],
+                "InvalidParameters": [n for n in Names if n not in self.parameters],
+            }
+
+        self.ssm_client.get_parameters.side_effect = get_parameters
+
+        self.assertEqual(
+            self.bc.get_parameters(
+                ["K1", "K2", "JSON", "INT", "FALSE1", "/OTHER/Prod/Key", "NO_NO"],
+                types={"JSON": "json", "INT": "int", "FALSE1": "bool"},
+                default=None,
+            ),
+            {
+                "K1": "V1",
+                "K2": "V2",
+                "JSON": {"some": "value"},
+                "INT": 1,
+                "FALSE1": False,
+                "/OTHER/Prod/Key": "Value",
+                "NO_NO": None,
+            },
+        )
+        # 4 candidates * 4 missing keys + 1 full path = 17 names -> 2 calls,
+        # 1 more call to decrypt K1
+        self.assertEqual(self.ssm_client.get_parameters.call_count, 3)
+        self.ssm_client.get_parameter.assert_not_called()
+
+        self.assertEqual(
+            self.bc.get_parameters(["INT", "NO_NO"], types="int", default=0),
+            {"INT": 1, "NO_NO": 0},
+        )
+        self.assertEqual(self.ssm_client.get_parameters.call_count, 3)
+
+        with self.assertRaises(bridgeconfig.ParameterNotFound):
+            self.bc.get_parameters(["K2", "NO_NO"])
+        self.assertEqual(
+            self.bc.get_parameters(["K2", "NO_NO"], default=None, include_path=True),
+            {"K2": ("/PJT/All/K2", "V2"), "NO_NO": (None, None)},
+        )
+
+    def test_get_parameter_not_found_cache(self):
+        self.assertIsNone(self.bc.get_parameter("NO_NO", default=None))
+        self.assertEqual(self.ssm_client.get_parameter.call_count, 4)
+        self.assertIsNone(self.bc.get_parameter("NO_NO", default=None))
+        self.assertIsNone(self.bc.get_parameter("/All/All/NO_NO", default=None))
+        self.assertEqual(self.ssm_client.get_parameter.call_count, 4)
+
+        self.parameters["/All/ENV/NO_NO"] = "created"
+        self.bc.refresh_cache()
+        self.assertEqual(self.bc.get_parameter("NO_NO"), "created")
+        self.assertEqual(self.ssm_client.get_parameter.call_count, 7)
+
+        bc = bridgeconfig.BridgeConfig(project="PJT", environment="ENV", negative_ttl=0)
+        bc.get_raw_parameters = self.bc.get_raw_parameters
+        self.assertIsNone(bc.get_parameter("NOT_THERE", default=None))
+        self.assertIsNone(bc.get_parameter("NOT_THERE", default=None))
+        self.assertEqual(self.ssm_client.get_parameter.call_count, 15)
+
     def test_conf(self):
         from bridgeconfig.conf import aws_formatter, settings
 
@@ -166,3 +674,114 @@ class TestBridgeConfig(unittest.TestCase):
             self.assertEquals(settings.K1, "V1")
             self.assertEquals(settings["K1"], "V1")
             self.assertEquals(settings["FULLPATH_KEY"], "Value")
+
+    def test_conf_resolved_values(self):
+        from bridgeconfig.conf import aws_formatter, settings
+
+        with patch.object(aws_formatter, "bridge_config", self.bc), patch.object(
+            self.bc, "get_parameter", wraps=self.bc.get_parameter
+        ) as get_parameter:
+            self.assertEqual(settings.K2, "V2")
+            self.assertEqual(settings.K2, "V2")
+            self.assertEqual(get_parameter.call_count, 1)
+
+            self.bc.get_raw_parameters.return_value[1] = {
+                "Name": "/PJT/All/K2",
+                "Value": "NEW",
+                "Type": "String",
+            }
+            self.bc.refresh_cache()
+            self.assertEqual(settings.K2, "NEW")
+            self.assertEqual(get_parameter.call_count, 2)
+
+            settings.set("OTHER", "value")
+            self.assertEqual(settings.K2, "NEW")
+            self.assertEqual(get_parameter.call_count, 3)
+            self.assertEqual(settings.OTHER, "value")
+            settings.unset("OTHER")
+
+            # mutable values aren't shared between callers
+            settings.set("DB", {"host": "h", "ports": [1]})
+            settings.DB["host"] = "x"
+            settings.DB["ports"].append(2)
+            self.assertEqual(settings.DB, {"host": "h", "ports": [1]})
+            settings.unset("DB")
+
+            # tables built from the @aws values are resolved once and copied
+            self.bc.get_raw_parameters.return_value.append(
+                {"Name": "/PJT/All/J", "Value": '{"a": [1]}', "Type": "String"}
+            )
+            self.bc.refresh_cache()
+            settings.set("J", "@aws J json")
+            call_count = get_parameter.call_count
+            settings.J["a"].append(2)
+            self.assertEqual(settings.J, {"a": [1]})
+            self.assertEqual(get_parameter.call_count, call_count + 1)
+            settings.unset("J")
+
+    def test_conf_prefetch(self):
+        from bridgeconfig.backends import LocalSSM
+        from bridgeconfig.conf import aws_formatter, create_settings
+
+        ssm = LocalSSM(
+            {
+                "/PJT/ENV/K1": ("V1", "SecureString"),
+                "/PJT/All/K2": "V2",
+                "/OTHER/Prod/Key": ("Value", "SecureString"),
+            }
+        )
+        bc = bridgeconfig.BridgeConfig("PJT", "ENV", client=ssm, rate_limiter=None)
+        settings = create_settings(prefetch_aws=True)
+        with patch.object(aws_formatter, "bridge_config", bc):
+            self.assertEqual(settings.APP_NAME, "PJT")
+            # K1 decrypted and /OTHER/Prod/Key fetched in one request each
+            self.assertEqual(ssm.calls["GetParameters"], 2)
+            self.assertEqual(settings.K1, "V1")
+            self.assertEqual(settings.K2, "V2")
+            self.assertEqual(settings.FULLPATH_KEY, "Value")
+            self.assertEqual(
+                dict(ssm.calls), {"GetParametersByPath": 4, "GetParameters": 2}
+            )
+
+    def test_async_bridgeconfig(self):
+        def get_parameters_by_path(Path, **kwargs):
+            return {
+                "Parameters": [
+                    {
+                        "Name": name,
+                        "Value": "Still-Encrypted-Value",
+                        "Type": "SecureString",
+                    }
+                    for name in self.parameters
+                    if name.startswith(Path)
+                ]
+            }
+
+        self.ssm_client.get_parameters_by_path.side_effect = get_parameters_by_path
+
+        async def run():
+            bc = AsyncBridgeConfig(project="PJT", environment="ENV")
+            values = await asyncio.gather(
+                bc.get_parameter("K1"),
+                bc.get_parameter("JSON", type="json"),
+                bc.get_parameter("INT", type="int"),
+                bc.get_parameter("/OTHER/Prod/Key"),
+                bc.get_parameter("NO_NO", default=None),
+            )
+            self.assertEqual(values, ["V1", {"some": "value"}, 1, "Value", None])
+            with self.assertRaises(bridgeconfig.ParameterNotFound):
+                await bc.get_parameter("NO_NO")
+
+            self.assertEqual(
+                await bc.get_all_parameters(decrypt=True),
+                [
+                    {"name": "/PJT/ENV/FALSE1", "value": "false"},
+                    {"name": "/PJT/ENV/FALSE2", "value": "no"},
+                    {"name": "/PJT/ENV/K1", "value": "V1"},
+                    {"name": "/All/ENV/INT", "value": "1"},
+                    {"name": "/All/All/JSON", "value": '{"some": "value"}'},
+                ],
+            )
+
+        asyncio.run(run())
+        self.assertEqual(self.ssm_client.get_parameters_by_path.call_count, 4)
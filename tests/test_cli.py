@@ -0,0 +1,248 @@
+import json
+import re
+import unittest
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from bridgeconfig.backends import LocalSSM
+from bridgeconfig.bridgeconfig import registry
+from bridgeconfig.cli import cli
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.ssm = LocalSSM(
+            {
+                "/All/All/SHARED": "S",
+                "/PJT/dev/SAME": "V",
+                "/PJT/stg/SAME": "V",
+                "/PJT/dev/SECRET": ("dev-secret", "SecureString"),
+                "/PJT/stg/SECRET": ("stg-secret", "SecureString"),
+                "/PJT/dev/ONLY_DEV": "D",
+            }
+        )
+        registry.clear()
+        patcher = patch.object(registry, "get_client", return_value=self.ssm)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(registry.clear)
+
+    def invoke(self, *args):
+        response = CliRunner().invoke(cli, ["-p", "PJT", "-e", "dev"] + list(args))
+        self.assertEqual(response.exit_code, 0, response.output)
+        # rows of the table, terminaltables draws the borders with vt100
+        # line drawing characters
+        border = "\x1b(0x\x1b(B"
+        return [
+            [cell.strip() for cell in line.split(border)[1:-1]]
+            for line in response.output.splitlines()
+            if line.startswith(border)
+        ]
+
+    def test_diff(self):
+        rows = self.invoke("diff", "stg")
+        self.assertEqual(
+            rows,
+            [
+                ["Keys", "dev", "stg"],
+                ["ONLY_DEV", "X", ""],
+                ["SAME", "X", "X"],
+                ["SECRET", "X", "X"],
+            ],
+        )
+        # /All/All/ and /PJT/All/ are fetched once for both environments
+        self.assertEqual(self.ssm.calls["GetParametersByPath"], 6)
+
+    def test_diff_values(self):
+        self.ssm.calls.clear()
+        rows = self.invoke("diff", "stg", "--values")
+        self.assertEqual(rows[0], ["Keys", "dev", "stg", "Differs"])
+        rows = {row[0]: row[1:] for row in rows[1:]}
+        self.assertEqual(rows["ONLY_DEV"][1:], ["", "X"])
+        self.assertEqual(rows["SAME"][0], rows["SAME"][1])
+        self.assertEqual(rows["SAME"][2], "")
+        self.assertNotEqual(rows["SECRET"][0], rows["SECRET"][1])
+        self.assertEqual(rows["SECRET"][2], "X")
+        self.assertNotIn("secret", str(rows))
+
+    def test_export(self):
+        response = CliRunner().invoke(cli, ["-p", "PJT", "-e", "dev", "export"])
+        records = [json.loads(line) for line in response.output.splitlines()]
+        self.assertEqual(
+            [(r["name"], r["value"]) for r in records],
+            [
+                ("/All/All/SHARED", "S"),
+                ("/PJT/dev/ONLY_DEV", "D"),
+                ("/PJT/dev/SAME", "V"),
+                ("/PJT/dev/SECRET", None),
+            ],
+        )
+        self.assertEqual(
+            (records[1]["prefix"], records[1]["key"]), ("/PJT/dev/", "ONLY_DEV")
+        )
+
+        response = CliRunner().invoke(
+            cli, ["-p", "PJT", "-e", "dev", "export", "-f", "env", "-x"]
+        )
+        self.assertEqual(
+            response.output.splitlines(),
+            [
+                "# prefix /All/All/",
+                'SHARED="S"',
+                "# prefix /PJT/dev/",
+                'ONLY_DEV="D"',
+                'SAME="V"',
+                "# type SecureString",
+                'SECRET="dev-secret"',
+            ],
+        )
+        self.assertEqual(self.ssm.calls["GetParameters"], 0)
+
+        response = CliRunner().invoke(
+            cli, ["-p", "PJT", "-e", "dev", "export", "-f", "toml", "--path", "/PJT/"]
+        )
+        self.assertEqual(
+            response.output.splitlines(),
+            [
+                '["/PJT/dev/"]',
+                '"ONLY_DEV" = { value = "D", type = "String" }',
+                '"SAME" = { value = "V", type = "String" }',
+                '["/PJT/stg/"]',
+                '"SAME" = { value = "V", type = "String" }',
+            ],
+        )
+
+    def test_import(self):
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            with open(".env", "w") as fp:
+                fp.write('# seed\nSAME="V"\nNEW="N"\nONLY_DEV=changed\n')
+
+            response = runner.invoke(
+                cli, ["-p", "PJT", "-e", "dev", "import", ".env", "--dry-run"]
+            )
+            self.assertIn("2 to write, 1 unchanged", response.output)
+            self.assertEqual(self.ssm.calls["PutParameter"], 0)
+
+            response = runner.invoke(cli, ["-p", "PJT", "-e", "dev", "import", ".env"])
+            self.assertIn("2 written, 1 unchanged", response.output)
+            self.assertEqual(self.ssm.calls["PutParameter"], 2)
+            self.assertEqual(self.ssm.calls["GetParameters"], 2)
+
+            # export -> import round trip doesn't write anything
+            response = runner.invoke(
+                cli, ["-p", "PJT", "-e", "dev", "export", "-x", "-o", "dev.jsonl"]
+            )
+            response = runner.invoke(
+                cli, ["-p", "PJT", "-e", "dev", "import", "dev.jsonl"]
+            )
+            self.assertIn("0 written, 5 unchanged", response.output)
+            self.assertEqual(self.ssm.calls["PutParameter"], 2)
+
+    def planned(self, output):
+        # {path: (type, change)} of the table printed by import
+        return {
+            path: (value_type, change)
+            for path, value_type, change in re.findall(
+                r"(/\S+)\s+\S+\s+(\w+)\s+\S+\s+(create|update)", output
+            )
+        }
+
+    def test_import_keeps_type(self):
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            runner.invoke(
+                cli,
+                ["-p", "PJT", "-e", "dev", "export", "-x", "-f", "toml"]
+                + ["--path", "/PJT/dev/", "-o", "dev.toml"],
+            )
+            with open("dev.toml") as fp:
+                self.assertIn(
+                    '"SECRET" = { value = "dev-secret", type = "SecureString" }',
+                    fp.read(),
+                )
+            self.ssm.put_parameter(
+                Name="/PJT/dev/SECRET",
+                Value="changed",
+                Type="SecureString",
+                Overwrite=True,
+            )
+            response = runner.invoke(
+                cli, ["-p", "PJT", "-e", "dev", "import", "dev.toml"]
+            )
+            self.assertEqual(
+                self.planned(response.output),
+                {"/PJT/dev/SECRET": ("SecureString", "update")},
+            )
+            self.assertIn("1 written, 2 unchanged", response.output)
+            self.assertEqual(
+                self.ssm.get_parameter(Name="/PJT/dev/SECRET")["Parameter"]["Type"],
+                "SecureString",
+            )
+
+            # the parameters without a type keep the current one unless -t
+            with open("secret.env", "w") as fp:
+                fp.write('SECRET="other"\nNEW="N"\n')
+            response = runner.invoke(
+                cli, ["-p", "PJT", "-e", "dev", "import", "secret.env", "--dry-run"]
+            )
+            self.assertEqual(
+                self.planned(response.output),
+                {
+                    "/PJT/dev/SECRET": ("SecureString", "update"),
+                    "/PJT/dev/NEW": ("String", "create"),
+                },
+            )
+            response = runner.invoke(
+                cli,
+                ["-p", "PJT", "-e", "dev", "import", "secret.env", "--dry-run"]
+                + ["-t", "String"],
+            )
+            self.assertEqual(
+                self.planned(response.output)["/PJT/dev/SECRET"], ("String", "update")
+            )
+
+    def test_export_import_environment(self):
+        self.ssm.put_parameter(Name="/PJT/dev/db/host", Value="h")
+        self.ssm.put_parameter(Name="/PJT/dev/db.port", Value="5432")
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            for output_format in ("jsonl", "env", "toml"):
+                filename = "dev." + output_format
+                runner.invoke(
+                    cli,
+                    ["-p", "PJT", "-e", "dev", "export", "-x", "-o", filename]
+                    + ["-f", output_format],
+                )
+                # the dev parameters are planned for stg, the shared ones and
+                # the ones with the same value are kept
+                response = runner.invoke(
+                    cli, ["-p", "PJT", "-e", "stg", "import", filename, "--dry-run"]
+                )
+                rows = response.output.split("\n")
+                self.assertIn("4 to write, 2 unchanged", response.output)
+                for path in (
+                    "/PJT/stg/ONLY_DEV",
+                    "/PJT/stg/SECRET",
+                    "/PJT/stg/db/host",
+                    "/PJT/stg/db.port",
+                ):
+                    self.assertTrue(any(path in row for row in rows), path)
+                self.assertNotIn("/PJT/dev/", response.output)
+                self.assertNotIn("/PJT/stg/SHARED", response.output)
+
+            response = runner.invoke(
+                cli, ["-p", "PJT", "-e", "stg", "import", "dev.env"]
+            )
+            self.assertIn("4 written, 2 unchanged", response.output)
+            self.assertEqual(
+                self.ssm.get_parameter(Name="/PJT/stg/db/host")["Parameter"]["Value"],
+                "h",
+            )
+            self.assertEqual(
+                self.ssm.get_parameter(Name="/PJT/stg/SECRET", WithDecryption=True)[
+                    "Parameter"
+                ]["Value"],
+                "dev-secret",
+            )
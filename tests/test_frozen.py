@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from bridgeconfig import frozen
+from bridgeconfig.backends import LocalSSM
+from bridgeconfig.bridgeconfig import BridgeConfig
+from bridgeconfig.conf import aws_formatter, create_settings
+
+os.environ["ENVIRONMENT"] = "ENV"
+os.environ["SETTINGS_PATH"] = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestFrozen(unittest.TestCase):
+    def setUp(self):
+        self.ssm = LocalSSM(
+            {
+                "/PJT/ENV/K1": ("V1", "SecureString"),
+                "/PJT/All/K2": "V2",
+                "/OTHER/Prod/Key": ("Value", "SecureString"),
+            }
+        )
+        self.bc = BridgeConfig("PJT", "ENV", client=self.ssm, rate_limiter=None)
+        patcher = patch.object(aws_formatter, "bridge_config", self.bc)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_freeze(self):
+        artifact = frozen.freeze(create_settings())
+        self.assertEqual(artifact["project"], "PJT")
+        self.assertEqual(artifact["environment"], "ENV")
+        self.assertEqual(
+            artifact["values"],
+            {"APP_NAME": "PJT", "ENVIRONMENT": "ENV", "ENV": "ENV", "K2": "V2"},
+        )
+        self.assertEqual(
+            artifact["references"],
+            {"K1": "K1 decrypt", "FULLPATH_KEY": "/OTHER/Prod/Key decrypt"},
+        )
+        self.assertEqual(
+            artifact["parameters"],
+            {
+                "K1": ["/PJT/ENV/K1", 1],
+                "K2": ["/PJT/All/K2", 1],
+                "/OTHER/Prod/Key": ["/OTHER/Prod/Key", 1],
+            },
+        )
+
+        omitted = frozen.freeze(create_settings(), secrets="omit")
+        self.assertEqual(omitted["references"], {})
+        self.assertEqual(sorted(omitted["omitted"]), ["FULLPATH_KEY", "K1"])
+
+        included = frozen.freeze(create_settings(), secrets="include")
+        self.assertEqual(included["values"]["K1"], "V1")
+        self.assertEqual(included["values"]["FULLPATH_KEY"], "Value")
+
+    def test_load_settings(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "settings.json")
+            frozen.dump(frozen.freeze(create_settings()), path)
+            self.assertIsNone(frozen.load_settings(path, environment="prod"))
+
+            self.ssm.calls.clear()
+            settings = frozen.load_settings(path, environment="ENV")
+            self.assertEqual(settings.K2, "V2")
+            self.assertEqual(settings["APP_NAME"], "PJT")
+            self.assertEqual(dict(self.ssm.calls), {})
+
+            # references are resolved together on first access
+            self.bc.refresh_cache()
+            self.ssm.calls.clear()
+            self.assertEqual(settings.K1, "V1")
+            self.assertEqual(settings.FULLPATH_KEY, "Value")
+            self.assertEqual(dict(self.ssm.calls), {"GetParameters": 2})
+            self.assertNotIn("K3", settings)
+            with self.assertRaises(AttributeError):
+                settings.K3
+
+    def test_check_stale(self):
+        artifact = frozen.freeze(create_settings())
+        self.assertEqual(frozen.check_stale(artifact, self.bc), {})
+
+        self.ssm.put_parameter(Name="/PJT/All/K2", Value="NEW", Overwrite=True)
+        self.ssm.put_parameter(Name="/PJT/ENV/K2", Value="SHADOW")
+        self.bc.refresh_cache()
+        self.assertEqual(
+            frozen.check_stale(artifact, self.bc),
+            {"K2": (["/PJT/All/K2", 1], ["/PJT/ENV/K2", 1])},
+        )
@@ -0,0 +1,82 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = [
+    "asyncio",
+    "boto3",
+    "botocore",
+    "click",
+    "dynaconf",
+    "termcolor",
+    "terminaltables",
+]
+
+
+def imported_modules(code):
+    # runs code in a fresh interpreter and returns the heavy modules it loaded
+    output = subprocess.check_output(
+        [
+            sys.executable,
+            "-c",
+            code
+            + "\nimport json, sys\nprint(json.dumps(sorted("
+            + "m for m in {!r} if m in sys.modules)))".format(HEAVY_MODULES),
+        ],
+        cwd=ROOT,
+    )
+    return json.loads(output.decode().splitlines()[-1])
+
+
+class TestImports(unittest.TestCase):
+    def test_import_bridgeconfig(self):
+        self.assertEqual(imported_modules("import bridgeconfig"), [])
+
+    def test_snapshot_without_boto3(self):
+        with tempfile.TemporaryDirectory() as directory:
+            code = "\n".join(
+                [
+                    "from bridgeconfig.bridgeconfig import BridgeConfig, Parameter",
+                    "from bridgeconfig.snapshot import Snapshot",
+                    "snapshot = Snapshot({!r})".format(directory),
+                    "snapshot.save('PJT', 'ENV', [Parameter('/PJT/ENV/K', 'V')])",
+                    "bc = BridgeConfig('PJT', 'ENV', snapshot=snapshot)",
+                    "assert bc.get_parameter('K') == 'V'",
+                ]
+            )
+            self.assertEqual(imported_modules(code), [])
+
+    def test_lazy_attributes(self):
+        self.assertEqual(
+            imported_modules(
+                "\n".join(
+                    [
+                        "import bridgeconfig",
+                        "import bridgeconfig.cli",
+                        "assert callable(bridgeconfig.cli.cli.main)",
+                        "assert bridgeconfig.AsyncBridgeConfig",
+                        "from bridgeconfig import conf",
+                        "assert 'settings' not in vars(conf)",
+                    ]
+                )
+            ),
+            ["asyncio", "click", "dynaconf"],
+        )
+
+    def test_cli_module(self):
+        code = "\n".join(
+            [
+                "import bridgeconfig.cli as module",
+                "import click",
+                "assert callable(module.print_table)",
+                "assert isinstance(module.cli, click.Group)",
+                "from bridgeconfig import cli",
+                "assert cli is module",
+            ]
+        )
+        self.assertIn("click", imported_modules(code))
@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import MagicMock
+
+from bridgeconfig.backends import LocalSSM
+from bridgeconfig.bridgeconfig import BridgeConfig
+from bridgeconfig.metrics import InMemorySink, Metrics, StatsdSink
+from bridgeconfig.throttle import RateLimitedClient, TokenBucket
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.ssm = LocalSSM(
+            {
+                "/PJT/ENV/K{:02}".format(i): ("V{}".format(i), "SecureString")
+                for i in range(15)
+            }
+        )
+        self.metrics = Metrics()
+        self.sink = self.metrics.add(InMemorySink())
+        self.bc = BridgeConfig("PJT", "ENV", client=self.ssm, metrics=self.metrics)
+
+    def test_ssm_calls(self):
+        self.bc.refresh_cache()
+        self.assertEqual(self.sink.count("ssm.calls"), 5)
+        self.assertEqual(
+            self.sink.count("ssm.calls", operation="get_parameters_by_path"), 5
+        )
+        self.assertEqual(self.sink.count("ssm.pages", project="PJT"), 5)
+        self.assertEqual(
+            len(
+                self.sink.timings[
+                    ("ssm.latency", (("operation", "get_parameters_by_path"),))
+                ]
+            ),
+            5,
+        )
+        self.assertEqual(
+            len(
+                self.sink.timings[
+                    ("refresh.duration", (("environment", "ENV"), ("project", "PJT")))
+                ]
+            ),
+            1,
+        )
+
+        self.bc.decrypt_parameters()
+        self.assertEqual(self.sink.count("decrypt.batches"), 2)
+        self.assertEqual(self.sink.count("decrypt.parameters"), 15)
+        self.assertEqual(self.sink.count("ssm.calls", operation="get_parameters"), 2)
+
+    def test_cache(self):
+        self.bc.get_parameter("K00")
+        self.bc.get_parameter("NOPE", default=None)
+        self.bc.get_parameter("NOPE", default=None)
+        self.bc.get_parameters(["K01", "K02", "OTHER"], default=None)
+        self.assertEqual(self.sink.count("cache.hits"), 3)
+        self.assertEqual(self.sink.count("cache.misses"), 3)
+        self.assertEqual(self.sink.count("cache.negative_hits"), 4)
+        self.assertEqual(self.sink.count("ssm.errors", code="ParameterNotFound"), 4)
+
+    def test_retries_are_counted(self):
+        ssm = LocalSSM({"/PJT/ENV/K": "V"}, throttle_rate=0.5, seed=1)
+        bc = BridgeConfig(
+            "PJT",
+            "ENV",
+            client=ssm,
+            metrics=self.metrics,
+            rate_limiter=TokenBucket(rate=10000, min_rate=5000),
+        )
+        bc.client.max_delay = 0.01
+        self.assertIsInstance(bc.client, RateLimitedClient)
+        bc.refresh_cache()
+        self.assertEqual(self.sink.count("ssm.calls"), ssm.calls["GetParametersByPath"])
+        self.assertEqual(
+            self.sink.count("ssm.errors", code="ThrottlingException"),
+            ssm.calls["GetParametersByPath"] - 4,
+        )
+
+    def test_statsd(self):
+        client = MagicMock()
+        sink = StatsdSink(client)
+        sink.incr("ssm.calls", tags={"operation": "get_parameter"})
+        sink.timing("ssm.latency", 0.25)
+        client.incr.assert_called_once_with("bridgeconfig.ssm.calls.get_parameter", 1)
+        client.timing.assert_called_once_with("bridgeconfig.ssm.latency", 250)
@@ -0,0 +1,70 @@
+import unittest
+
+from bridgeconfig.backends import LocalSSM
+from bridgeconfig.bridgeconfig import BridgeConfig, Registry
+from bridgeconfig.throttle import RateLimitedClient, ThrottlingError, TokenBucket
+
+
+class TestThrottle(unittest.TestCase):
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=1000, capacity=2, min_rate=10, recovery=100)
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertGreater(bucket.acquire(), 0)
+
+        for _ in range(10):
+            bucket.throttled()
+        self.assertEqual(bucket.rate, 10)
+        bucket.succeeded()
+        self.assertEqual(bucket.rate, 110)
+        for _ in range(20):
+            bucket.succeeded()
+        self.assertEqual(bucket.rate, 1000)
+
+    def test_retry(self):
+        ssm = LocalSSM({"/PJT/ENV/K": "V"}, throttle_rate=0.5, seed=1)
+        limiter = TokenBucket(rate=10000, min_rate=5000)
+        client = RateLimitedClient(
+            ssm, limiter, max_attempts=20, base_delay=0.001, max_delay=0.01
+        )
+        for _ in range(20):
+            self.assertEqual(
+                client.get_parameter(Name="/PJT/ENV/K")["Parameter"]["Value"], "V"
+            )
+        self.assertGreater(ssm.calls["GetParameter"], 20)
+        self.assertIs(client.exceptions, ssm.exceptions)
+
+    def test_throttling_error(self):
+        ssm = LocalSSM({"/PJT/ENV/K": "V"}, throttle_rate=1)
+        limiter = TokenBucket(rate=10000, min_rate=100)
+        client = RateLimitedClient(ssm, limiter, max_attempts=3, base_delay=0.001)
+        with self.assertRaises(ThrottlingError) as error:
+            client.get_parameter(Name="/PJT/ENV/K")
+        self.assertEqual(error.exception.attempts, 3)
+        self.assertEqual(ssm.calls["GetParameter"], 3)
+        self.assertEqual(limiter.rate, 1250)
+
+        # errors other than throttling are not retried
+        ssm.throttle_rate = 0
+        with self.assertRaises(ssm.exceptions.ParameterNotFound):
+            client.get_parameter(Name="/PJT/ENV/NOPE")
+        self.assertEqual(ssm.calls["GetParameter"], 4)
+
+    def test_bridgeconfig(self):
+        ssm = LocalSSM({"/PJT/ENV/K": "V"})
+        bc = BridgeConfig("PJT", "ENV", client=ssm)
+        self.assertIsInstance(bc.client, RateLimitedClient)
+        self.assertNotIsInstance(
+            BridgeConfig("PJT", "ENV", client=ssm, rate_limiter=None).client,
+            RateLimitedClient,
+        )
+        self.assertEqual(bc.get_parameter("K"), "V")
+
+    def test_botocore_retries(self):
+        # only RateLimitedClient retries, so every request takes a token
+        limited = BridgeConfig("PJT", "ENV").client.client.client
+        self.assertEqual(limited.meta.config.retries["total_max_attempts"], 1)
+        shared = Registry().get_client("us-east-1").client.client
+        self.assertEqual(shared.meta.config.retries["total_max_attempts"], 1)
+        unlimited = BridgeConfig("PJT", "ENV", rate_limiter=None).client.client
+        self.assertNotEqual(unlimited.meta.config.retries.get("total_max_attempts"), 1)